@@ -8,6 +8,8 @@ extras_require["lint"] = sorted({"flake8", "black"})
 
 extras_require["test"] = sorted({"pytest"})
 
+extras_require["columnar"] = sorted({"pyarrow"})
+
 extras_require["example"] = sorted(
     {
         "jupyter",
@@ -20,6 +22,7 @@ extras_require["develop"] = sorted(
     set(
         extras_require["lint"]
         + extras_require["test"]
+        + extras_require["columnar"]
         + extras_require["example"]
         + [
             "pre-commit",
@@ -1,6 +1,8 @@
 """Common/required functionality for DataSet-like classes."""
 from abc import ABC, abstractmethod
 
+from .channel_cache import get_fingerprint
+
 
 class AbstractDataSet(ABC):
     """Defines the functionality that code outside of data_handling can depend on.
@@ -17,6 +19,36 @@ class AbstractDataSet(ABC):
     def get_channels(self):
         pass
 
+    @property
+    def channel_names(self):
+        return list(self.get_channels())
+
+    @property
+    def channel_versions(self):
+        """The `version` of each channel.
+
+        Compare with an earlier result to find the channels that changed.
+        """
+        return {k: c.version for k, c in self.get_channels().items()}
+
+    @property
+    def fingerprint(self):
+        """Stable hash of everything that defines the fit problem.
+
+        Two data sets with equal fingerprints describe the same problem.
+        It combines the channel fingerprints (see `_DataChannel.fingerprint`)
+        with the settings of the data set.
+        Useful for cache keys, deduplication and result provenance.
+        """
+        return get_fingerprint(
+            channels={k: c.fingerprint for k, c in self.get_channels().items()},
+            decay_names=list(self.decay_names),
+            data_brs=self.data_brs,
+            fit_start_brs=self.fit_start_brs,
+            luminosity_ifb=self.luminosity_ifb,
+            signal_scaler=self.signal_scaler,
+        )
+
     @property
     @abstractmethod
     def decay_names(self):
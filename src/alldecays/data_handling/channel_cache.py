@@ -0,0 +1,65 @@
+"""On-disk cache for the processed content of `_PureDataChannel` objects.
+
+Parsing a channel file, splitting its MC statistics and building the
+probability matrices is repeated every time a channel is loaded.
+The results only depend on the content of the channel file(s) and on the
+loader options. They are stored as uncompressed `.npz` files,
+named after a hash of exactly these inputs.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from ..util import _write_atomic
+
+# Increase when the processing in `_PureDataChannel` changes its results.
+_cache_format_version = 2
+_chunk_size = 1 << 20
+
+
+def file_hash(path):
+    """The sha256 hex digest of a file's content."""
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(_chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def get_cache_key(source_paths, **loader_options):
+    """Hash of the source file contents and the options used to load them."""
+    key_content = {
+        "format": _cache_format_version,
+        "files": [file_hash(p) for p in source_paths],
+        "options": loader_options,
+    }
+    key_txt = json.dumps(key_content, sort_keys=True, default=list)
+    return hashlib.sha256(key_txt.encode()).hexdigest()
+
+
+def get_fingerprint(**content):
+    """Stable hash of names and numbers (including numpy arrays and pd.Index)."""
+    txt = json.dumps(content, sort_keys=True, default=lambda x: x.tolist())
+    return hashlib.sha256(txt.encode()).hexdigest()
+
+
+def has_cached_channel(cache_dir, key):
+    return (Path(cache_dir) / f"{key}.npz").is_file()
+
+
+def load_cached_channel(cache_dir, key):
+    """Return the cached arrays as a dict, or None if not in the cache."""
+    cache_path = Path(cache_dir) / f"{key}.npz"
+    if not cache_path.is_file():
+        return None
+    with np.load(cache_path, allow_pickle=False) as npz:
+        return {k: npz[k] for k in npz.files}
+
+
+def store_cached_channel(cache_dir, key, arrays):
+    """Write the arrays into the cache (atomically, see `_write_atomic`)."""
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    _write_atomic(cache_dir / f"{key}.npz", lambda f: np.savez(f, **arrays))
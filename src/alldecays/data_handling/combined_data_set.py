@@ -1,9 +1,12 @@
 """Combination of data sets class"""
+import copy
+
 import numpy as np
 
 from alldecays.exceptions import DataSetError
 
 from .abstract_data_set import AbstractDataSet
+from .data_channel import _versions
 
 
 class CombinedDataSet(AbstractDataSet):
@@ -15,6 +18,11 @@ class CombinedDataSet(AbstractDataSet):
         True
         >>> combined = alldecays.CombinedDataSet(decay_names, {"ds1": ds1})
         >>> combined.add_data_sets({"ds2": ds2})
+
+    CombinedDataSet objects can also be combined (e.g. one per energy stage).
+    The channel names are then prefixed on each level: `outer:inner:channel`.
+    The flattened channel dict is built once and only rebuilt when channels
+    are added to or dropped from one of the combined data sets.
     """
 
     def __init__(
@@ -35,6 +43,7 @@ class CombinedDataSet(AbstractDataSet):
         self._data_sets = data_sets if data_sets is not None else {}
         for ds in self._data_sets.values():
             self._validate_data_set(ds)
+        self._data_sets_changed()
 
     def _validate_data_set(self, ds):
         """Validate that a dataset fits to this CombinedDataSet."""
@@ -45,20 +54,50 @@ class CombinedDataSet(AbstractDataSet):
         assert (self.fit_start_brs == ds.fit_start_brs).all()
         assert self.signal_scaler == ds.signal_scaler
 
+    def _data_sets_changed(self):
+        self._data_sets_version = next(_versions)
+        self._channel_index = None
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._data_sets_changed()  # See `_DataChannel.__setstate__`.
+
+    @property
+    def _channel_index_key(self):
+        """Changes whenever channels are added or dropped (on any level)."""
+        return (
+            self._data_sets_version,
+            tuple(ds._channel_index_key for ds in self._data_sets.values()),
+        )
+
     @property
     def _channels(self):
-        channels = {}
-        for prefix in self._data_sets:
-            for name, channel in self._data_sets[prefix].get_channels().items():
-                n = f"{prefix}:{name}"
-                if n in channels:
-                    raise DataSetError(f"Multiple channels with same name: {n}.")
-                channels[n] = channel
-        return channels
+        return self.get_channels()
 
     def get_channels(self):
         """Return a dict of all channels."""
-        return self._channels
+        for ds in self._data_sets.values():
+            ds.get_channels()  # Load pending channels first.
+        key = self._channel_index_key
+        if self._channel_index is None or self._channel_index[0] != key:
+            channels = {}
+            for prefix, ds in self._data_sets.items():
+                for name, channel in ds.get_channels().items():
+                    n = f"{prefix}:{name}"
+                    if n in channels:
+                        raise DataSetError(f"Multiple channels with same name: {n}.")
+                    channels[n] = channel
+            self._channel_index = (key, channels)
+        return self._channel_index[1]
+
+    @property
+    def channel_names(self):
+        """The channel names, without loading pending channels."""
+        return [
+            f"{prefix}:{name}"
+            for prefix, ds in self._data_sets.items()
+            for name in ds.channel_names
+        ]
 
     @property
     def decay_names(self):
@@ -134,9 +173,38 @@ class CombinedDataSet(AbstractDataSet):
             if prefix in self._data_sets:
                 raise DataSetError(f"A DataSet with {prefix=} already exists.")
             self._data_sets[prefix] = ds
+        self._data_sets_changed()
+
+    _clone_overrides = ["decay_names", "data_brs", "fit_start_brs", "signal_scaler"]
+
+    def clone(self, drop_bkg=None, **overrides):
+        """A copy with some settings changed, see `DataSet.clone`.
+
+        All combined DataSet objects are cloned
+        (a DataSet that is combined under multiple prefixes is cloned once).
+        """
+        unknown = set(overrides) - set(self._clone_overrides)
+        if unknown:
+            raise TypeError(
+                f"Cannot override {unknown} in a {self.__class__.__name__}."
+            )
+        new = copy.copy(self)
+        clones = {}
+        new._data_sets = {}
+        for prefix, ds in self._data_sets.items():
+            if id(ds) not in clones:
+                clones[id(ds)] = ds.clone(drop_bkg)
+            new._data_sets[prefix] = clones[id(ds)]
+        new._data_sets_changed()
+        new._data_brs = copy.copy(self._data_brs)
+        new._fit_start_brs = copy.copy(self._fit_start_brs)
+        for name in self._clone_overrides:
+            if name in overrides:
+                setattr(new, name, overrides[name])
+        return new
 
     def __repr__(self):
-        n_channels = len(self.get_channels())
+        n_channels = len(self.channel_names)
         n_data_sets = len(self._data_sets)
         text = f"{self.__class__.__name__} with {n_channels} channels.\n"
         text += f"  {n_data_sets} DataSet objects: {list(self._data_sets)}.\n"
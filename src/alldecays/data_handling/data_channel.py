@@ -1,4 +1,7 @@
 """Class for loading a data channel."""
+import copy
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
@@ -6,9 +9,14 @@ import pandas as pd
 
 from alldecays.exceptions import DataChannelError
 
-from .pure_data_channel import _PureDataChannel
+from ..util import _read_only
+from .channel_cache import get_fingerprint
+from .pure_data_channel import _find_channel_files, _load_pure_channel
 from .util import _polarization_cases, get_polarization_weights
 
+# Process-wide, so that a version identifies one state of one channel object.
+_versions = itertools.count()
+
 
 class _DataChannel:
     """Meant to be used within a `DataSet`."""
@@ -22,14 +30,18 @@ class _DataChannel:
         luminosity_ifb=1_000,
         signal_scaler=1.0,
         ignore_limited_mc_statistics_bias=False,
+        cache_dir=None,
     ):
+        self._version = next(_versions)
+        self._derived = {}
+        self._data_brs = None
         self._decay_names = decay_names
         self.data_brs = self._set_brs(data_brs)
         self.luminosity_ifb = luminosity_ifb
         self.signal_scaler = signal_scaler
         self._set_initial_polarization(polarization)
         self._pure_channels = self._link_pure_channels(
-            channel_path, ignore_limited_mc_statistics_bias
+            channel_path, ignore_limited_mc_statistics_bias, cache_dir
         )
         self._set_polarization_dependent_values()
 
@@ -41,6 +53,80 @@ class _DataChannel:
             raise DataChannelError(f"{brs=}, {n_decays=}.")
         return brs
 
+    def _clone(self):
+        """Copy that shares the parsed arrays with this channel.
+
+        The arrays are never modified in place: setters and `drop_bkg`
+        replace them (copy-on-write). So changes to the clone do not
+        propagate to this channel, and vice versa.
+        """
+        new = copy.copy(self)
+        new._pure_channels = {k: copy.copy(pc) for k, pc in self._pure_channels.items()}
+        new._derived = dict(self._derived)
+        return new
+
+    @property
+    def version(self):
+        """Changes whenever the content of this channel changes.
+
+        Setting a value that is equal to the current one is not a change.
+        Versions are unique within the process, so `version` can be used
+        to tell whether (and which) channels changed since it was last seen.
+        """
+        return self._version
+
+    def _changed(self):
+        self._version = next(_versions)
+
+    def __setstate__(self, state):
+        # Versions are only unique within a process: A pickled version can be
+        # drawn again here, and would make the derived values look current.
+        self.__dict__.update(state)
+        self._derived = {}
+        self._changed()
+
+    def _get_derived(self, name, compute):
+        """The result of `compute()`, recomputed only after changes."""
+        version, value = self._derived.get(name, (None, None))
+        if version != self._version:
+            value = compute()
+            self._derived[name] = (self._version, value)
+        return value
+
+    @property
+    def data_brs(self):
+        return self._data_brs
+
+    @data_brs.setter
+    def data_brs(self, new_brs):
+        # Read-only, so that the version cannot be bypassed by in-place changes.
+        new_brs = np.array(new_brs, dtype=float)
+        new_brs.setflags(write=False)
+        if self._data_brs is not None and np.array_equal(new_brs, self._data_brs):
+            return
+        self._data_brs = new_brs
+        self._changed()
+
+    @property
+    def luminosity_ifb(self):
+        return self._luminosity_ifb
+
+    @luminosity_ifb.setter
+    def luminosity_ifb(self, new_value):
+        if getattr(self, "_luminosity_ifb", None) != new_value:
+            self._luminosity_ifb = new_value
+            self._changed()
+
+    @property
+    def signal_scaler(self):
+        return self._signal_scaler
+
+    @signal_scaler.setter
+    def signal_scaler(self, new_value):
+        if getattr(self, "_signal_scaler", None) != new_value:
+            self._signal_scaler = new_value
+            self._changed()
+
     def _set_initial_polarization(self, polarization):
         self._polarization = polarization
         self._validate_polarization(polarization)
@@ -66,17 +152,26 @@ class _DataChannel:
         ):
             raise DataChannelError(f"Invalid polarization: {pol=}.")
 
-    def _link_pure_channels(self, channel_path, ignore_limited_mc_statistics_bias):
+    def _link_pure_channels(
+        self, channel_path, ignore_limited_mc_statistics_bias, cache_dir=None
+    ):
         if self.polarization is None:
             return {
-                "pure": _PureDataChannel(
-                    channel_path, self.decay_names, ignore_limited_mc_statistics_bias
+                "pure": _load_pure_channel(
+                    channel_path,
+                    self.decay_names,
+                    ignore_limited_mc_statistics_bias,
+                    cache_dir=cache_dir,
                 )
             }
-        pure_channel_store = {}
-        csv_path = Path(channel_path)
-        dir_files = list(csv_path.glob("*.csv"))
-        file_stems = {p.stem: p for p in dir_files}
+        pol_dir = Path(channel_path)
+        file_stems = {}
+        for p in _find_channel_files(pol_dir):
+            if p.stem in file_stems:
+                raise DataChannelError(
+                    f"Ambiguous channel files: {file_stems[p.stem]} and {p}."
+                )
+            file_stems[p.stem] = p
         train_stems = {}
         test_stems = {}
         for pol, pure_path in file_stems.items():
@@ -90,20 +185,28 @@ class _DataChannel:
         elif set(file_stems).issuperset(_polarization_cases):
             pass
         else:
-            txt = f"Missing polarized data file in {str(csv_path)}."
+            txt = f"Missing polarized data file in {str(pol_dir)}."
             if len(file_stems) == 0:
                 txt += "\nNone found."
             else:
                 txt += "\n" + f"Only found {sorted(set(file_stems))}."
             txt += f" We need: {_polarization_cases}."
             raise DataChannelError(txt)
-        for pol in _polarization_cases:
-            pure_channel_store[pol] = _PureDataChannel(
+
+        def load_pure_channel(pol):
+            return _load_pure_channel(
                 file_stems[pol],
                 self.decay_names,
                 ignore_limited_mc_statistics_bias,
                 allow_zero_signal=True,
+                cache_dir=cache_dir,
             )
+
+        # The pure polarizations are loaded concurrently.
+        # `map` returns them (or raises the first exception) in input order.
+        with ThreadPoolExecutor(len(_polarization_cases)) as executor:
+            pure_channels = executor.map(load_pure_channel, _polarization_cases)
+            pure_channel_store = dict(zip(_polarization_cases, pure_channels))
         return pure_channel_store
 
     @property
@@ -113,6 +216,8 @@ class _DataChannel:
     @polarization.setter
     def polarization(self, pol):
         self._validate_polarization(pol)
+        if pol is None or tuple(pol) == tuple(self._polarization):
+            return  # Nothing to recompute.
         self._polarization = pol
         self._set_polarization_dependent_values()
 
@@ -121,49 +226,88 @@ class _DataChannel:
             pc = self._pure_channels["pure"]
             self.signal_cs_default = pc.signal_cs_default
             self.bkg_cs_default = pc.bkg_cs_default
-            self.mc_matrix = pc.mc_matrix
-            self._data_faker = pc._data_faker
+            self._box_index = pc._box_index
+            self._set_process_arrays(pc._process_index, pc._mc_array, pc._faker_array)
             return
 
         weights = get_polarization_weights(self.polarization)
         pcs = list(self._pure_channels.items())
         bkg_names = set(pcs[0][1].bkg_names)
-        box_names = pcs[0][1].box_names
+        box_index = pcs[0][1].box_names
         for _, pc in pcs:
             bkg_names |= set(pc.bkg_names)
-            if set(box_names) != set(pc.box_names):
-                raise DataChannelError(f"{box_names=} != {pc.box_names=}.")
-
-        def polarized_matrix(pure_dfs):
-            pm = pd.DataFrame(
-                0, columns=self.decay_names + sorted(bkg_names), index=box_names
+            if set(box_index) != set(pc.box_names):
+                raise DataChannelError(f"{box_index=} != {pc.box_names=}.")
+        process_index = pd.Index(self.decay_names + sorted(bkg_names))
+        # Map the rows and columns of each pure channel onto the polarized ones.
+        pure_positions = {
+            p: (
+                pc._box_index.get_indexer(box_index),
+                process_index.get_indexer(pc._process_index),
             )
-            for process in pm.columns:
-                norm = 0
-                for (pol, df) in pure_dfs.items():
-                    if process not in df.columns or np.isnan(sum(df[process])):
-                        continue
-                    w = weights[pol]
-                    norm += w
-                    pm[process] = pm[process] + w * df[process]
-                if norm != 0:
-                    pm[process] = pm[process] / norm
+            for p, pc in pcs
+        }
+
+        def polarized_array(pure_arrays):
+            """Weighted mean over the polarizations in which a process is present.
+
+            Processes with NaN entries (no MC events) in a pure polarization
+            do not contribute there.
+            """
+            pm = np.zeros((len(box_index), len(process_index)))
+            norm = np.zeros(len(process_index))
+            for pol, pure_array in pure_arrays.items():
+                rows, columns = pure_positions[pol]
+                pure_array = pure_array[rows]
+                present = ~np.isnan(pure_array).any(axis=0)
+                w = weights[pol]
+                norm[columns[present]] += w
+                pm[:, columns[present]] += w * pure_array[:, present]
+            has_norm = norm != 0
+            pm[:, has_norm] /= norm[has_norm]
             return pm
 
-        self.mc_matrix = polarized_matrix({p: pc.mc_matrix for (p, pc) in pcs})
-        self._data_faker = polarized_matrix({p: pc._data_faker for (p, pc) in pcs})
+        self._box_index = box_index
+        self._set_process_arrays(
+            process_index,
+            polarized_array({p: pc._mc_array for (p, pc) in pcs}),
+            polarized_array({p: pc._faker_array for (p, pc) in pcs}),
+        )
 
         self.signal_cs_default = sum(
             weights[p] * pc.signal_cs_default for (p, pc) in pcs
         )
+        n_decays = len(self.decay_names)
         self.bkg_cs_default = np.zeros(len(self.bkg_names))
-        for i, bkg_name in enumerate(self.bkg_names):
-            for p, pc in pcs:
-                try:
-                    idx = pc.bkg_names.index(bkg_name)
-                except ValueError:
-                    continue
-                self.bkg_cs_default[i] += pc.bkg_cs_default[idx] * weights[p]
+        for p, pc in pcs:
+            bkg_positions = pure_positions[p][1][n_decays:] - n_decays
+            self.bkg_cs_default[bkg_positions] += pc.bkg_cs_default * weights[p]
+
+    def _set_process_arrays(self, process_index, mc_array, faker_array):
+        self._process_index = process_index
+        self._bkg_names = list(process_index[len(self.decay_names) :])
+        self._mc_array = mc_array
+        self._faker_array = faker_array
+        # For the expected counts, processes without MC events contribute zero.
+        self._finite_faker_array = np.where(np.isnan(faker_array), 0, faker_array)
+        self._changed()
+
+    def _rename_processes(self, new_names):
+        self._set_process_arrays(pd.Index(new_names), self._mc_array, self._faker_array)
+
+    @property
+    def mc_matrix(self):
+        """DataFrame view (boxes x processes) on the MC efficiency array."""
+        return pd.DataFrame(
+            self._mc_array, index=self._box_index, columns=self._process_index
+        )
+
+    @property
+    def _data_faker(self):
+        """Like `mc_matrix`, from the MC statistics used for the expected counts."""
+        return pd.DataFrame(
+            self._faker_array, index=self._box_index, columns=self._process_index
+        )
 
     @property
     def decay_names(self):
@@ -175,12 +319,30 @@ class _DataChannel:
             pc.decay_names = new_names
         if len(self.decay_names) != len(new_names):
             raise Exception(f"{self.decay_names=}, {new_names=}.")
-        for df in [self._data_faker, self.mc_matrix]:  # Order matters!
-            df.rename(
-                columns={old: new for (old, new) in zip(self.decay_names, new_names)},
-                inplace=True,
-            )
         self._decay_names = new_names
+        self._rename_processes(list(new_names) + self.bkg_names)
+
+    @property
+    def fingerprint(self):
+        """Hash of the channel content and of the settings that change it.
+
+        Covers the loaded content, the decay/bkg/box names, the BRs,
+        the luminosity, the polarization and the signal scaler.
+        The content part is computed once per pure channel.
+        The settings are cheap to hash and are always taken as they are now.
+        """
+        return self._get_derived(
+            "fingerprint",
+            lambda: get_fingerprint(
+                pure_channels={
+                    k: pc.fingerprint for k, pc in self._pure_channels.items()
+                },
+                polarization=self.polarization,
+                data_brs=self.data_brs,
+                luminosity_ifb=self.luminosity_ifb,
+                signal_scaler=self.signal_scaler,
+            ),
+        )
 
     def drop_bkg(self, bkg_names):
         old_bkg_names = self.bkg_names
@@ -190,18 +352,12 @@ class _DataChannel:
             missing_bkg = set(bkg_names) - set(old_bkg_names)
             raise Exception(f"{missing_bkg} bkg not found.")
         for pc in self._pure_channels.values():
-            pure_names = pc.mc_matrix.columns
-            pure_bkg_names = [n for n in pure_names if n not in self.decay_names]
-            pure_drop_names = [n for n in bkg_names if n in pure_bkg_names]
-            drop_ids = [pure_bkg_names.index(name) for name in pure_drop_names]
-            pc._data_faker.drop(columns=pure_drop_names, inplace=True, errors="ignore")
-            pc.mc_matrix.drop(columns=pure_drop_names, inplace=True, errors="ignore")
-            pc.bkg_cs_default = np.delete(pc.bkg_cs_default, drop_ids)
+            pc._drop_processes(bkg_names)
         self._set_polarization_dependent_values()
 
     @property
     def bkg_names(self):
-        return [n for n in self.mc_matrix.columns if n not in self.decay_names]
+        return self._bkg_names
 
     @bkg_names.setter
     def bkg_names(self, new_names):
@@ -215,15 +371,11 @@ class _DataChannel:
             pc.bkg_names = new_pure_names
         if len(self.bkg_names) != len(new_names):
             raise Exception(f"{self.bkg_names=}, {new_names=}.")
-        for df in [self._data_faker, self.mc_matrix]:  # Order matters!
-            df.rename(
-                columns={old: new for (old, new) in zip(self.bkg_names, new_names)},
-                inplace=True,
-            )
+        self._rename_processes(list(self.decay_names) + list(new_names))
 
     @property
     def box_names(self):
-        return self.mc_matrix.index
+        return self._box_index
 
     @box_names.setter
     def box_names(self, new_names):
@@ -231,11 +383,8 @@ class _DataChannel:
             pc.box_names = new_names
         if len(self.box_names) != len(new_names):
             raise Exception(f"{self.box_names=}, {new_names=}.")
-        for df in [self._data_faker, self.mc_matrix]:  # Order matters!
-            df.rename(
-                index={old: new for (old, new) in zip(self.box_names, new_names)},
-                inplace=True,
-            )
+        self._box_index = pd.Index(new_names)
+        self._changed()
 
     def __repr__(self):
         txt = "\n - ".join(
@@ -250,8 +399,20 @@ class _DataChannel:
         This uses statistics that are independent from those
         used for the `mc_matrix` in the likelihood building.
         """
+        expected_counts = self._get_expected_counts_array(data_brs)
+        return pd.Series(expected_counts.copy(), index=self._box_index)
+
+    def _get_expected_counts_array(self, data_brs=None):
+        """`get_expected_counts` as a numpy array.
+
+        For the channel's own `data_brs`, the read-only result is cached
+        until the channel changes.
+        """
         if data_brs is None:
-            data_brs = self.data_brs
+            return self._get_derived(
+                "expected_counts",
+                lambda: _read_only(self._calculate_expected_counts(self.data_brs)),
+            )
         else:
             if (
                 sum(data_brs) != 1
@@ -259,19 +420,105 @@ class _DataChannel:
                 or len(data_brs) != len(self.data_brs)
             ):
                 raise DataChannelError(f"Invalid BR hypothesis: {data_brs=}.")
-            data_brs = np.array(data_brs)
+            return self._calculate_expected_counts(np.array(data_brs))
+
+    def _calculate_expected_counts(self, data_brs):
         cs_signal = data_brs * self.signal_cs_default * self.signal_scaler
         cs = np.concatenate([cs_signal, self.bkg_cs_default])
         expected_process_counts = cs * self.luminosity_ifb
-        expected_matrix_counts = self._data_faker * expected_process_counts
-        expected_counts = expected_matrix_counts.sum(axis=1)
-        return expected_counts
+        return self._finite_faker_array @ expected_process_counts
+
+    def _get_fit_blocks(self):
+        """The signal matrix and bkg vector of this channel for the FitProblem.
+
+        Expected box counts: signal @ brs + bkg.
+        Cached (read-only) until the channel changes.
+        """
+
+        def calculate_fit_blocks():
+            n_decays = len(self.decay_names)
+            signal_factor = self.signal_cs_default * self.signal_scaler
+            signal = self._mc_array[:, :n_decays] * signal_factor
+            signal *= self.luminosity_ifb
+
+            # Processes without MC events (NaN) do not contribute.
+            bkg_box_probabilities = np.nansum(
+                self._mc_array[:, n_decays:]
+                * self.bkg_cs_default
+                / self.bkg_cs_default.sum(),
+                axis=1,
+            )
+            bkg = bkg_box_probabilities * self.bkg_cs_default.sum()
+            bkg *= self.luminosity_ifb
+            return _read_only(signal), _read_only(bkg)
+
+        return self._get_derived("fit_blocks", calculate_fit_blocks)
 
     def get_toys(self, size=None, data_brs=None, rng=None):
         """Smear the expected counts with respect to statistical uncertainties."""
-        expected_counts = self.get_expected_counts(data_brs)
-        n_data = int(sum(expected_counts))
-        box_probabilities = expected_counts / sum(expected_counts)
+        expected_counts = self._get_expected_counts_array(data_brs)
+        n_data = int(expected_counts.sum())
+        box_probabilities = expected_counts / expected_counts.sum()
         if rng is None:
             rng = np.random.default_rng()
         return rng.multinomial(n_data, box_probabilities, size=size)
+
+    def _validate_brs_batch(self, data_brs):
+        data_brs = np.asarray(data_brs, dtype=np.float64)
+        if data_brs.ndim != 2 or data_brs.shape[1] != len(self.data_brs):
+            raise DataChannelError(
+                f"Expected BR hypotheses of shape (n_hypotheses, "
+                f"{len(self.data_brs)}), got {data_brs.shape}."
+            )
+        invalid = ~np.isclose(data_brs.sum(axis=1), 1) | (data_brs < 0).any(axis=1)
+        if invalid.any():
+            raise DataChannelError(
+                f"Invalid BR hypotheses at indices {np.flatnonzero(invalid)}: "
+                f"{data_brs[invalid]}."
+            )
+        return data_brs
+
+    def get_expected_counts_batch(self, data_brs):
+        """Get the expected counts for many BR hypotheses at once.
+
+        Args:
+            data_brs: Array of shape (n_hypotheses, n_decays).
+                Each row must sum to 1 (within float precision).
+
+        Returns:
+            numpy.ndarray: Shape (n_hypotheses, n_boxes).
+        """
+        data_brs = self._validate_brs_batch(data_brs)
+        cs_signal = data_brs * self.signal_cs_default * self.signal_scaler
+        cs_bkg = np.broadcast_to(
+            self.bkg_cs_default, (len(data_brs), len(self.bkg_cs_default))
+        )
+        cs = np.concatenate([cs_signal, cs_bkg], axis=1)
+        expected_process_counts = cs * self.luminosity_ifb
+        return expected_process_counts @ self._finite_faker_array.T
+
+    def get_toys_batch(self, data_brs, size=None, rng=None):
+        """Smear the expected counts of many BR hypotheses at once.
+
+        Args:
+            data_brs: Array of shape (n_hypotheses, n_decays).
+            size: Number of toys per hypothesis.
+            rng: A numpy random Generator.
+
+        Returns:
+            numpy.ndarray: Shape (n_hypotheses, size, n_boxes),
+                or (n_hypotheses, n_boxes) if `size` is None.
+        """
+        expected_counts = self.get_expected_counts_batch(data_brs)
+        total_counts = expected_counts.sum(axis=1)
+        n_data = total_counts.astype(np.int64)
+        box_probabilities = expected_counts / total_counts[:, np.newaxis]
+        if rng is None:
+            rng = np.random.default_rng()
+        if size is None:
+            return rng.multinomial(n_data, box_probabilities)
+        return rng.multinomial(
+            n_data[:, np.newaxis],
+            box_probabilities[:, np.newaxis, :],
+            size=(len(n_data), size),
+        )
@@ -2,6 +2,8 @@
 
 These objects are used throughout the module to interact with the physics data.
 """
+import copy
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
@@ -9,7 +11,8 @@ import numpy as np
 from alldecays.exceptions import DataSetError
 
 from .abstract_data_set import AbstractDataSet
-from .data_channel import _DataChannel
+from .data_channel import _DataChannel, _versions
+from .event_tables import _open_events, write_count_tables
 
 
 class DataSet(AbstractDataSet):
@@ -24,6 +27,10 @@ class DataSet(AbstractDataSet):
 
     This assumes files `eLpL.csv`, `eLpR.csv`, `eRpL.csv`, `eRpR.csv`
     in `pol_dir` with at least the `decay_names` rows.
+    Instead of .csv, the columnar formats .parquet, .feather/.arrow
+    (both require pyarrow) and .npz can be used.
+    Channels can also be histogrammed from per-event arrays,
+    see `add_channel_from_events`.
 
     As a design choice, channels are added by the path to their data file.
     This emphasizes that `_DataChannel`s are only meant to be used internally.
@@ -31,6 +38,12 @@ class DataSet(AbstractDataSet):
     Args:
         data_brs: default is  flat branching ratio.
         fit_start_brs: If not specified, defaults to `data_brs`.
+        cache_dir: If specified, the processed channel data is cached there
+            in a binary format. Channels with unchanged files and options
+            are then loaded from the cache.
+        lazy: If True, `add_channel` only registers the channel path.
+            The channels are loaded on the next `get_channels` call
+            (e.g. when a `Fit` is created), with the settings at that time.
     """
 
     def __init__(
@@ -42,8 +55,14 @@ class DataSet(AbstractDataSet):
         luminosity_ifb=1_000,
         signal_scaler=1.0,
         ignore_limited_mc_statistics_bias=False,
+        cache_dir=None,
+        lazy=False,
     ):
         self._channels = {}
+        # {name: (channel_path, decay names in the channel files)}.
+        self._pending_channels = {}
+        self._channels_changed()
+        self._lazy = lazy
         self._decay_names = decay_names
         self._polarization = polarization
         self._data_brs = self._set_brs(data_brs)
@@ -54,11 +73,31 @@ class DataSet(AbstractDataSet):
         self._luminosity_ifb = luminosity_ifb
         self._signal_scaler = signal_scaler
         self._ignore_limited_mc_statistics_bias = ignore_limited_mc_statistics_bias
+        self._cache_dir = cache_dir
 
     def get_channels(self):
         """Return a dict of all channels."""
+        if self._pending_channels:
+            self._load_channels(dict(self._pending_channels))
         return self._channels
 
+    def _channels_changed(self):
+        self._channels_version = next(_versions)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._channels_changed()  # See `_DataChannel.__setstate__`.
+
+    @property
+    def _channel_index_key(self):
+        """Changes whenever channels are added, loaded or dropped."""
+        return self._channels_version
+
+    @property
+    def channel_names(self):
+        """The channel names, without loading pending channels."""
+        return list(self._channels) + list(self._pending_channels)
+
     @property
     def decay_names(self):
         return self._decay_names
@@ -127,42 +166,177 @@ class DataSet(AbstractDataSet):
             dc.signal_scaler = new_value
         self._signal_scaler = new_value
 
-    def add_channel(self, name, channel_path=None):
-        """Add a channel to the DataSet."""
+    def _new_channel_name_and_path(self, name, channel_path=None):
         if channel_path is None:
             channel_path = Path(name)
             name = channel_path.stem
         name = str(name)
-        if name in self._channels:
+        if name in self.channel_names:
             raise DataSetError(
                 f"A channel with {name=} already exists in the "
-                f"{self.__class__.__name__}: {list(self._channels.keys())}."
+                f"{self.__class__.__name__}: {self.channel_names}."
             )
-        self._channels[name] = _DataChannel(
+        return name, channel_path
+
+    def _load_channel(self, channel_path, file_decay_names=None):
+        """Load the channel, with the decay names of its files.
+
+        Pending channels of a lazy DataSet are registered with the decay names
+        at that time. They are renamed to the current ones after loading.
+        """
+        if file_decay_names is None:
+            file_decay_names = self.decay_names
+        dc = _DataChannel(
             channel_path,
-            self.decay_names,
+            file_decay_names,
             polarization=self.polarization,
             data_brs=self._data_brs,
             luminosity_ifb=self._luminosity_ifb,
             signal_scaler=self.signal_scaler,
             ignore_limited_mc_statistics_bias=self._ignore_limited_mc_statistics_bias,
+            cache_dir=self._cache_dir,
+        )
+        if list(file_decay_names) != list(self.decay_names):
+            dc.decay_names = self.decay_names
+        return dc
+
+    def add_channel(self, name, channel_path=None):
+        """Add a channel to the DataSet."""
+        name, channel_path = self._new_channel_name_and_path(name, channel_path)
+        if self._lazy:
+            self._pending_channels[name] = (channel_path, self.decay_names)
+        else:
+            self._channels[name] = self._load_channel(channel_path)
+        self._channels_changed()
+
+    def add_channel_from_events(
+        self, name, events, table_dir, box_names, cross_sections, **kwargs
+    ):
+        """Add a channel that is histogrammed from per-event arrays.
+
+        The channel tables are written to `table_dir` (see
+        `event_tables.write_count_tables`) and then loaded with `add_channel`.
+        The events need a `polarization` field exactly if the DataSet is
+        polarized. Weighted events need a `test_fraction`, unless the DataSet
+        ignores the limited MC statistics bias (the counts are not split then).
+        For all arguments, see `event_tables.get_count_tables`.
+        Returns:
+            The channel path, to add the channel again without the events.
+        """
+        name, _ = self._new_channel_name_and_path(name, table_dir)
+        events = _open_events(events)
+        if (self.polarization is None) == ("polarization" in events):
+            raise DataSetError(
+                f"The events for {name=} must have a `polarization` field "
+                f"exactly if the DataSet is polarized ({self.polarization=})."
+            )
+        channel_path = write_count_tables(
+            table_dir,
+            name,
+            events,
+            box_names,
+            cross_sections,
+            ignore_limited_mc_statistics_bias=self._ignore_limited_mc_statistics_bias,
+            **kwargs,
         )
+        self.add_channel(name, channel_path)
+        return channel_path
+
+    def add_channels(self, channel_path_dict, n_workers=None):
+        """Convenience wrapper around `add_channel`.
 
-    def add_channels(self, channel_path_dict):
-        """Convenience wrapper around `add_channel`."""
+        The channels are loaded concurrently by a pool of `n_workers` threads,
+        and added in the order of `channel_path_dict`.
+        If a channel cannot be loaded, the channels before it are added
+        and its exception is raised. This does not depend on the timing
+        of the threads.
+        """
+        new_channels = {}
         for name, channel_path in channel_path_dict.items():
-            self.add_channel(name, channel_path)
+            name, channel_path = self._new_channel_name_and_path(name, channel_path)
+            if name in new_channels:
+                raise DataSetError(f"Multiple channels with same name: {name}.")
+            new_channels[name] = (channel_path, self.decay_names)
+        if self._lazy:
+            self._pending_channels.update(new_channels)
+            self._channels_changed()
+        else:
+            self._load_channels(new_channels, n_workers)
+
+    def _load_channels(self, new_channels, n_workers=None):
+        """Load {name: (channel_path, file_decay_names)} concurrently."""
+        with ThreadPoolExecutor(n_workers) as executor:
+            loaded = executor.map(
+                lambda args: self._load_channel(*args), new_channels.values()
+            )
+            for name, channel in zip(new_channels, loaded):
+                self._channels[name] = channel
+                self._pending_channels.pop(name, None)
+                self._channels_changed()
+
+    _clone_overrides = [
+        "decay_names",
+        "polarization",
+        "data_brs",
+        "fit_start_brs",
+        "luminosity_ifb",
+        "signal_scaler",
+    ]
+
+    def clone(self, drop_bkg=None, **overrides):
+        """A copy of this DataSet with some settings changed.
+
+        Example:
+            >>> scaled = ds.clone(signal_scaler=1.2)
+            >>> no_zz = ds.clone(drop_bkg=["ZZ"])
+
+        The clone shares the parsed channel matrices with this DataSet
+        instead of reloading the files. Only the changed settings
+        and the arrays derived from them are recomputed.
+        Changes to the clone (or to this DataSet) do not affect the other.
+
+        Args:
+            drop_bkg: Bkg processes to remove from all channels that have them.
+            overrides: New values for the settings in `DataSet._clone_overrides`.
+        """
+        unknown = set(overrides) - set(self._clone_overrides)
+        if unknown:
+            raise TypeError(
+                f"Cannot override {unknown} in a {self.__class__.__name__}."
+            )
+        new = copy.copy(self)
+        new._channels = {name: dc._clone() for name, dc in self._channels.items()}
+        new._pending_channels = dict(self._pending_channels)
+        new._channels_changed()
+        new._data_brs = copy.copy(self._data_brs)
+        new._fit_start_brs = copy.copy(self._fit_start_brs)
+        for name in self._clone_overrides:
+            if name in overrides:
+                setattr(new, name, overrides[name])
+        if drop_bkg is not None:
+            new._drop_bkg(drop_bkg)
+        return new
+
+    def _drop_bkg(self, bkg_names):
+        for dc in self.get_channels().values():
+            channel_bkg_names = [name for name in bkg_names if name in dc.bkg_names]
+            if channel_bkg_names:
+                dc.drop_bkg(channel_bkg_names)
 
     def drop_channels(self, names):
         """Remove channels from the DataSet by name."""
         for name in names:
-            self._channels.pop(name)
+            if name in self._pending_channels:
+                self._pending_channels.pop(name)
+            else:
+                self._channels.pop(name)
+            self._channels_changed()
 
     def __repr__(self):
-        n_channels = len(self._channels)
+        n_channels = len(self.channel_names)
         text = f"{self.__class__.__name__} with {n_channels} channels.\n"
         if n_channels != 0:
-            text += f"  Channel names: {list(self._channels.keys())}.\n"
+            text += f"  Channel names: {self.channel_names}.\n"
 
         if self.polarization is None:
             pol_str = "unpolarized."
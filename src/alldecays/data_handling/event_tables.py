@@ -0,0 +1,209 @@
+"""Build the channel tables directly from per-event arrays.
+
+Each event has a process, a box (the category it was selected into,
+or `unselected`), optionally a weight and, for polarized channels,
+the pure polarization it was simulated with.
+The events are histogrammed chunk by chunk with `np.bincount`,
+so memory-mapped inputs of any size can be used.
+The resulting tables have the same layout as the channel .csv files.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from alldecays.exceptions import DataChannelError, DataSetError
+
+from .pure_data_channel import (
+    channel_file_suffixes,
+    cross_section_column,
+    unselected_column,
+)
+from .util import _polarization_cases
+
+_default_chunk_size = 1 << 20
+
+
+def _open_events(events):
+    """A mapping from field name to (possibly memory-mapped) 1D array.
+
+    `events` can be a mapping of arrays, a structured array,
+    a structured `.npy` file or a folder with one `{field}.npy` file per field.
+    Files are memory-mapped: Only the current chunk is read into memory.
+    """
+    if isinstance(events, (str, Path)):
+        path = Path(events)
+        if path.is_dir():
+            return {p.stem: np.load(p, mmap_mode="r") for p in path.glob("*.npy")}
+        events = np.load(path, mmap_mode="r")
+    if isinstance(events, np.ndarray):
+        if events.dtype.names is None:
+            raise DataChannelError("Event arrays must be structured (named fields).")
+        return {name: events[name] for name in events.dtype.names}
+    return events
+
+
+def _to_codes(values, names, field, int_offset=0):
+    """Integer codes into `names`, from integer codes or from labels."""
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        codes = values.astype(np.int64) + int_offset
+        invalid = (codes < 0) | (codes >= len(names))
+    else:
+        names = np.asarray(names, dtype=str)
+        order = np.argsort(names)
+        positions = np.searchsorted(names[order], values.astype(str))
+        positions = np.minimum(positions, len(names) - 1)
+        codes = order[positions]
+        invalid = names[codes] != values.astype(str)
+    if invalid.any():
+        raise DataChannelError(
+            f"Unknown {field} values: {np.unique(values[invalid])[:10]}."
+        )
+    return codes
+
+
+def get_count_tables(
+    events,
+    box_names,
+    cross_sections,
+    test_fraction=None,
+    rng=None,
+    chunk_size=_default_chunk_size,
+    name="channel",
+):
+    """Histogram per-event arrays into channel tables.
+
+    Args:
+        events: Arrays with one entry per event, see `_open_events`.
+            `process`: Process labels, or integer codes into the sorted names
+                of `cross_sections`.
+            `box`: Box labels, or integer codes into `box_names`.
+                -1 (or the label `unselected`) for unselected events.
+            `weight` (optional): Event weights.
+            `polarization` (polarized only): The pure polarization (`eLpR`, ...)
+                or integer codes into `["eLpL", "eLpR", "eRpL", "eRpR"]`.
+        box_names: The names of the boxes (categories).
+        cross_sections: {process: cross section [fb]} (or a pd.Series).
+            For polarized events {polarization: {process: cross section}}.
+        test_fraction: If given, each event is assigned to the test sample
+            with this probability. The tables are then returned as
+            `train_`/`test_` pairs, which `_PureDataChannel` uses instead of
+            splitting the counts itself. Needed for weighted events
+            (the split of counts assumes unweighted counts), unless the
+            channel is loaded with `ignore_limited_mc_statistics_bias`.
+        rng: For the event split. Fixed seed by default, for reproducibility.
+        chunk_size: The number of events that are processed at once.
+        name: The table name of an unpolarized channel.
+    Returns:
+        {table name: DataFrame}. The table names are the file stems that the
+            channel loading expects (`name`, `eLpR`, `train_eLpR`, ...).
+            Processes without events in a table are omitted from it.
+    """
+    events = _open_events(events)
+    polarized = "polarization" in events
+    if polarized:
+        pol_names = list(_polarization_cases)
+        process_names = sorted(
+            set().union(*(cs.keys() for cs in cross_sections.values()))
+        )
+    else:
+        pol_names = [name]
+        process_names = sorted(cross_sections.keys())
+    col_names = [unselected_column] + list(box_names)
+    split_names = [""] if test_fraction is None else ["train_", "test_"]
+    if test_fraction is not None and rng is None:
+        rng = np.random.default_rng(seed=1)  # Fixed for reproducibility.
+
+    shape = (len(pol_names), len(split_names), len(process_names), len(col_names))
+    n_bins = int(np.prod(shape))
+    sums = np.zeros(n_bins)
+    n_events = np.zeros(n_bins, dtype=np.int64)
+    n_total = len(events["process"])
+    weight = events.get("weight")
+    for start in range(0, n_total, chunk_size):
+        chunk = slice(start, min(start + chunk_size, n_total))
+        process = _to_codes(events["process"][chunk], process_names, "process")
+        col = _to_codes(events["box"][chunk], col_names, "box", int_offset=1)
+        flat = process * shape[3] + col
+        if len(split_names) > 1:
+            is_test = rng.random(len(flat)) < test_fraction
+            flat += is_test * (shape[2] * shape[3])
+        if polarized:
+            pol = _to_codes(events["polarization"][chunk], pol_names, "polarization")
+            flat += pol * (shape[1] * shape[2] * shape[3])
+        chunk_weight = None
+        if weight is not None:
+            chunk_weight = np.asarray(weight[chunk], dtype=np.float64)
+        sums += np.bincount(flat, weights=chunk_weight, minlength=n_bins)
+        n_events += np.bincount(flat, minlength=n_bins)
+    sums = sums.reshape(shape)
+    has_events = n_events.reshape(shape).sum(axis=3) > 0
+
+    tables = {}
+    for i, pol in enumerate(pol_names):
+        pol_cross_sections = (
+            cross_sections.get(pol, {}) if polarized else cross_sections
+        )
+        for j, split in enumerate(split_names):
+            rows = [k for k in range(len(process_names)) if has_events[i, j, k]]
+            names = [process_names[k] for k in rows]
+            table = pd.DataFrame(sums[i, j, rows], index=names, columns=col_names)
+            try:
+                cs = [pol_cross_sections[n] for n in names]
+            except KeyError as e:
+                raise DataChannelError(f"No cross section for {e} ({pol}).") from e
+            table.insert(0, cross_section_column, np.array(cs, dtype=np.float64))
+            tables[split + pol] = table
+    return tables
+
+
+def write_count_tables(
+    directory,
+    name,
+    events,
+    box_names,
+    cross_sections,
+    ignore_limited_mc_statistics_bias=False,
+    **kwargs,
+):
+    """Write the channel tables from `get_count_tables` as `.npz` files.
+
+    Unpolarized channels are written to `directory/{name}.npz`,
+    polarized channels into the folder `directory/{name}`.
+    Existing tables of the channel are replaced.
+    Weighted events need a `test_fraction`, unless the tables are only used
+    with `ignore_limited_mc_statistics_bias` (the counts are not split then).
+    Returns:
+        The channel path (for `DataSet.add_channel`).
+    """
+    events = _open_events(events)
+    if (
+        "weight" in events
+        and kwargs.get("test_fraction") is None
+        and not ignore_limited_mc_statistics_bias
+    ):
+        raise DataSetError(
+            f"The weighted events for {name=} need a `test_fraction`: "
+            "Weighted counts cannot be split into train and test samples."
+        )
+    tables = get_count_tables(events, box_names, cross_sections, name=name, **kwargs)
+    polarized = name not in tables and f"train_{name}" not in tables
+    table_dir = Path(directory) / name if polarized else Path(directory)
+    table_dir.mkdir(parents=True, exist_ok=True)
+    for stem in _polarization_cases if polarized else [name]:
+        for prefix in ["", "train_", "test_"]:
+            for suffix in channel_file_suffixes:
+                (table_dir / f"{prefix}{stem}{suffix}").unlink(missing_ok=True)
+    for stem, table in tables.items():
+        np.savez(
+            table_dir / f"{stem}.npz",
+            processes=np.array(table.index, dtype=str),
+            columns=np.array(table.columns, dtype=str),
+            values=table.values,
+        )
+    if polarized:
+        return table_dir
+    if name in tables:
+        return table_dir / f"{name}.npz"
+    return table_dir / f"train_{name}.npz"
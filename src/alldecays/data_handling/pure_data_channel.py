@@ -3,22 +3,177 @@
 Has a fixed polarization at creation.
 A DataChannel uses one or more of these under the hood.
 """
+import copy
+import csv
+import threading
+import weakref
 from pathlib import Path
+from typing import Dict
 
 import numpy as np
 import pandas as pd
 
+from .channel_cache import (
+    get_cache_key,
+    get_fingerprint,
+    has_cached_channel,
+    load_cached_channel,
+    store_cached_channel,
+)
+
 cross_section_column = "cross section [fb]"
 unselected_column = "unselected"
 bookkeeping_columns = (cross_section_column, unselected_column)
+# numpy's multivariate hypergeometric draws require fewer events than this.
+_max_hypergeometric_population = 10**9
+
+
+def _read_csv_table(csv_path):
+    """Read a channel table with explicit dtypes and pandas' C parser.
+
+    The first column holds the process names (str).
+    All other columns are parsed as float64 without type inference.
+    """
+    with open(csv_path, newline="") as f:
+        header = next(csv.reader(f))
+    dtypes = dict.fromkeys(header[1:], np.float64)
+    return pd.read_csv(
+        csv_path, index_col=0, dtype=dtypes, engine="c", low_memory=False
+    )
+
+
+def _read_arrow_table(arrow_path):
+    """Read a Feather/Arrow IPC file, memory-mapped. Requires pyarrow."""
+    from pyarrow import feather
+
+    return feather.read_table(arrow_path, memory_map=True).to_pandas()
+
+
+def _read_npz_table(npz_path):
+    """Read a channel table from the arrays `processes`, `columns` and `values`.
+
+    The names must be stored as str arrays: Pickled objects are not loaded.
+    """
+    with np.load(npz_path, allow_pickle=False) as npz:
+        return pd.DataFrame(
+            npz["values"],
+            # Not a RangeIndex for tables without rows, see `_read_table`.
+            index=pd.Index(npz["processes"].tolist(), dtype=object),
+            columns=npz["columns"].tolist(),
+        )
+
+
+_table_readers = {
+    ".csv": _read_csv_table,
+    ".parquet": pd.read_parquet,
+    ".feather": _read_arrow_table,
+    ".arrow": _read_arrow_table,
+    ".npz": _read_npz_table,
+}
+channel_file_suffixes = tuple(_table_readers)
+
+
+def _find_channel_files(directory):
+    """All files in `directory` with a supported channel table format."""
+    return sorted(
+        p for p in Path(directory).glob("*") if p.suffix in channel_file_suffixes
+    )
+
+
+def _read_table(table_path):
+    """Read a channel table in any of the `channel_file_suffixes` formats.
+
+    Columnar formats follow the same layout as the .csv files:
+    The process names are either the index of the stored DataFrame,
+    or its first column (e.g. for Feather files, which have no index).
+    """
+    df = _table_readers[table_path.suffix](table_path)
+    if isinstance(df.index, pd.RangeIndex):
+        df = df.set_index(df.columns[0])
+    df.index = df.index.astype(str).rename(None)
+    return df.astype(np.float64, copy=False)
+
+
+def _resolve_table_path(channel_path):
+    """The channel table file: `channel_path`, or the only table in that folder."""
+    table_path = Path(channel_path)
+    if table_path.is_dir():
+        dir_files = _find_channel_files(table_path)
+        if len(dir_files) == 1:
+            table_path = dir_files[0]
+        else:
+            if len(dir_files) == 0:
+                file_str = f" in {str(table_path)}."
+            else:
+                file_str = "\n    ".join(map(str, [":"] + dir_files))
+            txt = f"{len(dir_files)} candidate files found" + file_str
+            raise Exception(txt)
+    if not table_path.is_file():
+        raise FileNotFoundError(table_path)
+    if table_path.suffix not in channel_file_suffixes:
+        raise NotImplementedError(
+            f"{table_path}: Supported formats are {channel_file_suffixes}."
+        )
+    return table_path
+
+
+def _get_test_path(table_path):
+    """The `test_` partner of a `train_` file, or None for other files."""
+    if table_path.stem.startswith("train_"):
+        return table_path.parent / table_path.name.replace("train_", "test_")
+    return None
+
+
+def _draw_large_test_counts(counts, n_test, rng):
+    """Draw `n_test` of the events in `counts` with sequential binomials.
+
+    For populations beyond numpy's hypergeometric sampler. Each column draws
+    from its events with the share of the sample that is still missing,
+    limited to what the remaining columns can provide. So exactly `n_test`
+    events are drawn. For these counts, the binomial differs from the
+    hypergeometric draw without replacement only by a negligible amount.
+    """
+    test_counts = np.zeros_like(counts)
+    n_left, population_left = n_test, counts.sum()
+    for j, good in enumerate(counts):
+        population_left -= good  # The events in the later columns.
+        drawn = rng.binomial(good, n_left / (good + population_left)) if good else 0
+        test_counts[j] = min(max(drawn, n_left - population_left), n_left)
+        n_left -= test_counts[j]
+    return test_counts
+
+
+def _draw_test_counts(counts, test_fraction, rng):
+    """Draw the test share of the MC counts, process by process.
+
+    `counts` has one row per process. For each process, `int(test_fraction * N)`
+    of its `N` events are drawn without replacement
+    (a multivariate hypergeometric draw). The rows are drawn in order,
+    so that the split for a given `rng` seed does not change.
+
+    Processes with 10⁹ or more MC events exceed the range of numpy's
+    hypergeometric sampler. They are split by `_draw_large_test_counts`.
+    """
+    test_counts = np.zeros_like(counts)
+    for i, row in enumerate(counts):
+        n_test = int(test_fraction * row.sum())
+        if row.sum() < _max_hypergeometric_population:
+            test_counts[i] = rng.multivariate_hypergeometric(row, n_test)
+        else:
+            test_counts[i] = _draw_large_test_counts(row, n_test, rng)
+    return test_counts
 
 
 class _PureDataChannel:
-    """Wrapper for a single .csv data file.
+    """Wrapper for a single data file (.csv or a columnar format).
 
     Contains the data from one initial polarization for one channel.
     This usually is stored in a single file on disk.
     For internal usage.
+
+    If a `cache_dir` is given, the processed arrays are stored there
+    and reused by later channels with the same source files and options
+    (see `channel_cache.py`).
     """
 
     def __init__(
@@ -27,20 +182,134 @@ class _PureDataChannel:
         decay_names,
         ignore_limited_mc_statistics_bias=False,
         allow_zero_signal=False,
+        cache_dir=None,
     ):
         self._channel_path = channel_path
         self._decay_names = decay_names
         self._allow_zero_signal = allow_zero_signal
         self._ignore_limited_mc_statistics_bias = ignore_limited_mc_statistics_bias
-        df = self._get_dataframe()
+        # The options that the processed content depends on.
+        self._loader_options = dict(
+            decay_names=list(decay_names),
+            ignore_limited_mc_statistics_bias=bool(ignore_limited_mc_statistics_bias),
+            allow_zero_signal=bool(allow_zero_signal),
+        )
+        self._cache_key = None
+        self._fingerprint = None
+        if cache_dir is None:
+            self._load()
+            return
+
+        cache_key = self._source_key
+        cached = load_cached_channel(cache_dir, cache_key)
+        if cached is None:
+            self._load()
+            store_cached_channel(cache_dir, cache_key, self._to_arrays())
+        else:
+            self._from_arrays(cached)
+
+    @property
+    def _source_key(self):
+        """Hash of the source file contents and the loader options.
+
+        The key of the channel cache. Only computed when the cache is used,
+        as it reads the source files (again).
+        """
+        if self._cache_key is None:
+            self._cache_key = get_cache_key(
+                self._source_paths(), **self._loader_options
+            )
+        return self._cache_key
+
+    def _set_read_only(self):
+        """Protect the arrays, which are shared with copies of this channel."""
+        for array in [self.bkg_cs_default, self._mc_array, self._faker_array]:
+            array.setflags(write=False)
+
+    def _load(self):
+        df, test_df = self._get_dataframes()
 
         cs_default = self._get_default_cross_sections(df)
         self.signal_cs_default = cs_default[0]
         self.bkg_cs_default = cs_default[1:]
 
-        probability_matrices = self._get_probabilities(df)
-        self.mc_matrix = probability_matrices[0]
-        self._data_faker = probability_matrices[1]
+        mc_matrix, data_faker = self._get_probabilities(df, test_df)
+        self._box_index = mc_matrix.index
+        self._process_index = mc_matrix.columns
+        self._mc_array = np.ascontiguousarray(mc_matrix.values, dtype=np.float64)
+        if data_faker is mc_matrix:
+            self._faker_array = self._mc_array
+        else:
+            data_faker = data_faker.reindex(
+                index=self._box_index, columns=self._process_index
+            )
+            self._faker_array = np.ascontiguousarray(data_faker.values, np.float64)
+
+    def _to_arrays(self):
+        """The processed content, as plain arrays for the channel cache."""
+        return dict(
+            signal_cs_default=np.array(self.signal_cs_default),
+            bkg_cs_default=np.array(self.bkg_cs_default),
+            box_names=np.array(self._box_index, dtype=str),
+            process_names=np.array(self._process_index, dtype=str),
+            mc_array=self._mc_array,
+            faker_array=self._faker_array,
+            faker_is_mc_array=np.array(self._faker_array is self._mc_array),
+        )
+
+    def _from_arrays(self, arrays):
+        """Inverse of `_to_arrays`."""
+        self.signal_cs_default = arrays["signal_cs_default"][()]
+        self.bkg_cs_default = arrays["bkg_cs_default"]
+        self._box_index = pd.Index(arrays["box_names"].tolist())
+        self._process_index = pd.Index(arrays["process_names"].tolist())
+        self._mc_array = arrays["mc_array"]
+        if arrays["faker_is_mc_array"]:
+            self._faker_array = self._mc_array
+        else:
+            self._faker_array = arrays["faker_array"]
+
+    @property
+    def mc_matrix(self):
+        """DataFrame view (boxes x processes) on the MC efficiency array."""
+        return pd.DataFrame(
+            self._mc_array, index=self._box_index, columns=self._process_index
+        )
+
+    @property
+    def _data_faker(self):
+        """Like `mc_matrix`, from the MC statistics used for the expected counts."""
+        return pd.DataFrame(
+            self._faker_array, index=self._box_index, columns=self._process_index
+        )
+
+    @property
+    def fingerprint(self):
+        """Hash of the processed content and the current names.
+
+        Computed once, and again only after the names or processes changed.
+        Built from the loaded arrays, so that the source files are not read again.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = get_fingerprint(
+                decay_names=list(self.decay_names), **self._to_arrays()
+            )
+        return self._fingerprint
+
+    def _drop_processes(self, names):
+        """Remove bkg processes. Names that are not in this channel are ignored."""
+        drop_names = set(names)
+        keep = np.array([n not in drop_names for n in self._process_index], bool)
+        keep_bkg = keep[len(self.decay_names) :]
+        self.bkg_cs_default = self.bkg_cs_default[keep_bkg]
+        faker_is_mc_array = self._faker_array is self._mc_array
+        self._mc_array = np.ascontiguousarray(self._mc_array[:, keep])
+        if faker_is_mc_array:
+            self._faker_array = self._mc_array
+        else:
+            self._faker_array = np.ascontiguousarray(self._faker_array[:, keep])
+        self._process_index = self._process_index[keep]
+        self._fingerprint = None
 
     @property
     def decay_names(self):
@@ -50,72 +319,64 @@ class _PureDataChannel:
     def decay_names(self, new_names):
         if len(self.decay_names) != len(new_names):
             raise Exception(f"{self.decay_names=}, {new_names=}.")
-        for df in [self._data_faker, self.mc_matrix]:  # Order matters!
-            df.rename(
-                columns={old: new for (old, new) in zip(self.decay_names, new_names)},
-                inplace=True,
-            )
+        self._process_index = pd.Index(list(new_names) + self.bkg_names)
         self._decay_names = new_names
+        self._fingerprint = None
 
     @property
     def bkg_names(self):
-        return [n for n in self.mc_matrix.columns if n not in self.decay_names]
+        return list(self._process_index[len(self.decay_names) :])
 
     @bkg_names.setter
     def bkg_names(self, new_names):
         if len(self.bkg_names) != len(new_names):
             raise Exception(f"{self.bkg_names=}, {new_names=}.")
-        for df in [self._data_faker, self.mc_matrix]:  # Order matters!
-            df.rename(
-                columns={old: new for (old, new) in zip(self.bkg_names, new_names)},
-                inplace=True,
-            )
+        self._process_index = pd.Index(list(self.decay_names) + list(new_names))
+        self._fingerprint = None
 
     @property
     def box_names(self):
-        return self.mc_matrix.index
+        return self._box_index
 
     @box_names.setter
     def box_names(self, new_names):
         if len(self.box_names) != len(new_names):
             raise Exception(f"{self.box_names=}, {new_names=}.")
-        for df in [self._data_faker, self.mc_matrix]:  # Order matters!
-            df.rename(
-                index={old: new for (old, new) in zip(self.box_names, new_names)},
-                inplace=True,
-            )
+        self._box_index = pd.Index(new_names)
+        self._fingerprint = None
 
-    def _get_dataframe(self, csv_path=None):
-        if csv_path is None:
-            csv_path = Path(self._channel_path)
-        if csv_path.is_dir():
-            dir_files = list(csv_path.glob("*.csv"))
-            if len(dir_files) == 1:
-                csv_path = dir_files[0]
-            else:
-                if len(dir_files) == 0:
-                    file_str = f" in {str(csv_path)}."
-                else:
-                    file_str = "\n    ".join(map(str, [":"] + dir_files))
-                txt = f"{len(dir_files)} candidate files found" + file_str
-                raise Exception(txt)
-        if not csv_path.is_file():
-            raise FileNotFoundError(csv_path)
-        if not csv_path.suffix == ".csv":
-            raise NotImplementedError(csv_path)
-
-        df = pd.read_csv(csv_path, index_col=0)
-        if csv_path.stem.startswith("train_"):
-            test_path = csv_path.parent / csv_path.name.replace("train_", "test_")
-            test_df = pd.read_csv(test_path, index_col=0)
-            zero_cols = [c for c in test_df.columns if c not in bookkeeping_columns]
-            rows_missing_train = [i for i in test_df.index if i not in df.index]
-            if len(rows_missing_train) > 0:
-                rows_from_test = test_df.loc[rows_missing_train, :]
-                rows_from_test[zero_cols] = 0
-                df = pd.concat([df, rows_from_test])
-        df = self._order_processes(df)
-        return df
+    def _resolve_path(self):
+        return _resolve_table_path(self._channel_path)
+
+    def _source_paths(self):
+        """All files that the content of this channel is derived from."""
+        table_path = self._resolve_path()
+        test_path = _get_test_path(table_path)
+        if test_path is None:
+            return [table_path]
+        return [table_path, test_path]
+
+    def _get_dataframes(self):
+        """Read the channel table, and its `test_` partner if there is one.
+
+        Each file is parsed once.
+        Returns:
+            (df, test_df): `test_df` is None if the channel has no `test_` file.
+        """
+        table_path = self._resolve_path()
+        df = _read_table(table_path)
+        test_path = _get_test_path(table_path)
+        if test_path is None:
+            return self._order_processes(df), None
+
+        test_df = _read_table(test_path)
+        zero_cols = [c for c in test_df.columns if c not in bookkeeping_columns]
+        rows_missing_train = [i for i in test_df.index if i not in df.index]
+        if len(rows_missing_train) > 0:
+            rows_from_test = test_df.loc[rows_missing_train, :].copy()
+            rows_from_test[zero_cols] = 0
+            df = pd.concat([df, rows_from_test])
+        return self._order_processes(df), self._order_processes(test_df)
 
     def _order_processes(self, df):
         no_signal_found = len(set(self.decay_names).intersection(df.index)) == 0
@@ -184,7 +445,7 @@ class _PureDataChannel:
         proba = counts[box_columns].T / process_counts
         return proba
 
-    def _get_probabilities(self, df):
+    def _get_probabilities(self, df, test_df=None):
         ch_path = Path(self._channel_path)
         for required_column in [cross_section_column, unselected_column]:
             if required_column not in df.columns:
@@ -192,9 +453,8 @@ class _PureDataChannel:
                 txt += f"File: {ch_path}."
                 raise Exception(txt)
         counts_only = df[[c for c in df.columns if c != cross_section_column]]
-        if ch_path.stem.startswith("train_"):
-            test_path = ch_path.parent / ch_path.name.replace("train_", "test_")
-            test_counts = self._get_dataframe(test_path)[counts_only.columns]
+        if test_df is not None:
+            test_counts = test_df[counts_only.columns]
             if self._ignore_limited_mc_statistics_bias:
                 counts_only = counts_only.add(test_counts, fill_value=0)
                 train_proba = self._get_probabilities_from_counts(counts_only)
@@ -220,34 +480,94 @@ class _PureDataChannel:
         Using statistically independent events for these two cases allows us
         to evaluate the contribution to the uncertainty of the analysis
         from limited/finite simulated MC statistics.
+
+        The split is done per event: Non-integer counts are truncated.
+        Weighted counts should be split per event when they are created
+        (see `event_tables.get_count_tables`).
         """
         test_fraction = 0.5
         rng = np.random.default_rng(seed=1)  # Fixed for reproducibility.
-        test_rows = {}
-        for process, row in df.iterrows():
-            mc_counts = row.astype(int)
-            try:
-                test_rows[process] = rng.multivariate_hypergeometric(
-                    mc_counts, int(test_fraction * sum(mc_counts))
-                )
-            except ValueError as ve:
-                print(
-                    "\n".join(
-                        [
-                            "Error is expected if MC counts are extremely high (in the billions).",
-                            f"{self._channel_path=}, {mc_counts=}.",
-                            "This could be handled by adapting the random drawer,",
-                            "but was deemed unlikely to happen and thus not implemented.",
-                        ]
-                    )
-                )
-                raise ve
-        test_counts = pd.DataFrame.from_dict(test_rows, orient="index")
-        test_counts.columns = df.columns
-        train_counts = df.astype(int) - test_counts
+        counts = df.values.astype(np.int64)
+        test_counts = pd.DataFrame(
+            _draw_test_counts(counts, test_fraction, rng),
+            index=df.index,
+            columns=df.columns,
+        )
+        train_counts = df.astype(np.int64) - test_counts
         return train_counts, test_counts
 
     def __repr__(self):
         txt = f"{self.__class__.__name__} "
         txt += f"with data from {str(self._channel_path)}."
         return txt
+
+
+# Process-wide registry of the loaded channel files, see `_load_pure_channel`.
+# An entry lives as long as a channel that was created from it.
+_loaded_pure_channels: "weakref.WeakValueDictionary[tuple, _PureDataChannel]" = (
+    weakref.WeakValueDictionary()
+)
+_registry_lock = threading.Lock()
+_loading_locks: Dict[tuple, threading.Lock] = {}
+
+
+def _get_registry_key(channel_path, decay_names, **loader_options):
+    """The source files (with their size and modification time) and the options.
+
+    A file that changed on disk is loaded again.
+    """
+    table_path = _resolve_table_path(channel_path)
+    source_paths = [table_path]
+    test_path = _get_test_path(table_path)
+    if test_path is not None:
+        source_paths.append(test_path)
+    sources = []
+    for path in source_paths:
+        stat = path.stat()
+        sources.append((str(path.resolve()), stat.st_size, stat.st_mtime_ns))
+    return (tuple(sources), tuple(decay_names), tuple(sorted(loader_options.items())))
+
+
+def _load_pure_channel(
+    channel_path,
+    decay_names,
+    ignore_limited_mc_statistics_bias=False,
+    allow_zero_signal=False,
+    cache_dir=None,
+):
+    """A `_PureDataChannel`, with the files parsed at most once per process.
+
+    All channels from the same files and loader options share their (read-only)
+    arrays. Each call returns its own copy, so that the names and processes
+    can still be changed for each channel individually.
+    """
+    key = _get_registry_key(
+        channel_path,
+        decay_names,
+        ignore_limited_mc_statistics_bias=bool(ignore_limited_mc_statistics_bias),
+        allow_zero_signal=bool(allow_zero_signal),
+    )
+    with _registry_lock:
+        key_lock = _loading_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        loaded = _loaded_pure_channels.get(key)
+        if loaded is None:
+            loaded = _PureDataChannel(
+                channel_path,
+                list(decay_names),
+                ignore_limited_mc_statistics_bias,
+                allow_zero_signal=allow_zero_signal,
+                cache_dir=cache_dir,
+            )
+            loaded._set_read_only()
+            _loaded_pure_channels[key] = loaded
+        elif cache_dir is not None and not has_cached_channel(
+            cache_dir, loaded._source_key
+        ):
+            store_cached_channel(cache_dir, loaded._source_key, loaded._to_arrays())
+    with _registry_lock:
+        _loading_locks.pop(key, None)
+    pure_channel = copy.copy(loaded)
+    pure_channel._channel_path = channel_path
+    pure_channel._loaded = loaded  # Keeps the registry entry alive.
+    return pure_channel
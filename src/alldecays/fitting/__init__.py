@@ -1,5 +1,14 @@
 from .fit import Fit
+from .fit_cache import FitCache
+from .fit_problem import FitProblem
+from .result_store import ResultStore, StoredFit
+from .shared_fit_problem import SharedFitProblem
 
 __all__ = [
     "Fit",
+    "FitCache",
+    "FitProblem",
+    "ResultStore",
+    "StoredFit",
+    "SharedFitProblem",
 ]
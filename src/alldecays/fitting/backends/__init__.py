@@ -0,0 +1,48 @@
+"""Collects the available minimizer backends."""
+from iminuit import Minuit
+
+from .abstract_minimizer import AbstractMinimizer
+from .comparison import compare_backends
+from .newton import NewtonMinimizer
+from .scipy_minimizer import (
+    LBFGSBMinimizer,
+    LinearLeastSquaresMinimizer,
+    TrustConstrMinimizer,
+)
+
+available_backends = {
+    "Minuit": Minuit,
+    "L-BFGS-B": LBFGSBMinimizer,
+    "trust-constr": TrustConstrMinimizer,
+    "lsq_linear": LinearLeastSquaresMinimizer,
+    "Newton": NewtonMinimizer,
+}
+
+
+def get_backend(name):
+    """Returns the minimizer backend of the given name.
+
+    Allow direct passing of a class, instead of the name.
+    This enables custom backends, if they inherit from `AbstractMinimizer`.
+    """
+    if name is Minuit:
+        return name
+    try:
+        if issubclass(name, AbstractMinimizer):
+            return name
+    except TypeError:
+        pass
+
+    if name not in available_backends:
+        raise NotImplementedError(
+            f"No minimizer backend with the name {name} is implemented.\n"
+            f"Choose between: {available_backends.keys()}."
+        )
+    return available_backends[name]
+
+
+__all__ = [
+    "available_backends",
+    "compare_backends",
+    "get_backend",
+]
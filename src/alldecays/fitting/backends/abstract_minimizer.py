@@ -0,0 +1,185 @@
+"""The interface defining class for minimizer backends."""
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class AbstractMinimizer(ABC):
+    """Minimizer with the `iminuit.Minuit` surface that alldecays relies on.
+
+    `fit.Minuit` can be any object that provides this surface.
+    This allows running a fit through another minimizer without changes to
+    the fit plugins or to the plotting code:
+    `values`, `errors`, `covariance`, `valid`, `accurate`, `nfcn`, `fval`,
+    `parameters`, `limits`, `strategy` and `tol`.
+
+    `migrad` is kept as name of the minimization call, so that the fit steps
+    written for Minuit (e.g. `alldecays.fitting.fit.default_fit_step`)
+    can be used with any backend.
+
+    The cost function is expected to follow the Minuit conventions
+    (`fcn.errordef`). A backend can additionally make use of the optional
+    attributes that the fit plugins attach to their cost function:
+        fcn.grad(x): Gradient of the cost function.
+        fcn.hessian(x): Hessian matrix of the cost function.
+        fcn.least_squares: Tuple `(A, b)` with `fcn(x) = 0.5 * |A x - b|²`.
+    """
+
+    def __init__(self, fcn, start):
+        self._fcn = fcn
+        self._nfcn = 0
+        start = np.array(start, dtype=float)
+        self._values = start
+        self._errors = np.where(start != 0, 0.01 * np.abs(start), 0.1)
+        inf = float("infinity")
+        self._limits = [(-inf, inf)] * len(start)
+        self._covariance = None
+        self._fval = None
+        self._valid = False
+        self._accurate = False
+        self.strategy = 1
+        self.tol = 0.1
+
+    def __getstate__(self):
+        # The cost function is recreated by the fit plugin on unpickling
+        # (see `alldecays.fitting.backends.minimizer_state`).
+        state = self.__dict__.copy()
+        state["_fcn"] = None
+        return state
+
+    def __repr__(self):
+        status = "valid" if self.valid else "INVALID"
+        lines = [f"{self.__class__.__name__} ({status} minimum)"]
+        lines.append(f"  fval = {self.fval}, nfcn = {self.nfcn}")
+        for name, value, error in zip(self.parameters, self.values, self.errors):
+            lines.append(f"  {name}: {value:.6g} ± {error:.2g}")
+        return "\n".join(lines)
+
+    def _call_fcn(self, x):
+        self._nfcn += 1
+        return self._fcn(x)
+
+    def _call_grad(self, x):
+        return self._fcn.grad(x)
+
+    @property
+    def errordef(self):
+        return self._fcn.errordef
+
+    @property
+    def parameters(self):
+        return tuple(f"x{i}" for i in range(len(self._values)))
+
+    @property
+    def values(self):
+        return self._values.copy()
+
+    @values.setter
+    def values(self, new_values):
+        self._values = np.array(new_values, dtype=float)
+
+    @property
+    def errors(self):
+        return self._errors.copy()
+
+    @errors.setter
+    def errors(self, new_errors):
+        self._errors = np.array(new_errors, dtype=float)
+
+    @property
+    def limits(self):
+        return list(self._limits)
+
+    @limits.setter
+    def limits(self, new_limits):
+        if len(new_limits) != len(self._values):
+            raise ValueError(f"{len(new_limits)=} != {len(self._values)=}.")
+        self._limits = [tuple(map(float, limit)) for limit in new_limits]
+
+    @property
+    def covariance(self):
+        return self._covariance
+
+    @property
+    def valid(self):
+        return self._valid
+
+    @property
+    def accurate(self):
+        return self._accurate
+
+    @property
+    def nfcn(self):
+        return self._nfcn
+
+    @property
+    def fval(self):
+        return self._fval
+
+    @abstractmethod
+    def _minimize(self, ncall):
+        """Run the minimization and update `_values`, `_fval` and `_valid`."""
+        pass
+
+    def migrad(self, ncall=None):
+        """Run the minimization.
+
+        As for MIGRAD, the covariance is computed at the minimum
+        unless `strategy` is 0.
+        """
+        self._covariance = None
+        self._accurate = False
+        self._minimize(ncall)
+        if self.strategy > 0:
+            self.hesse()
+        return self
+
+    def hesse(self):
+        """Compute the covariance from the Hessian matrix at the minimum."""
+        hessian = self._hessian(self._values)
+        try:
+            # A Cholesky decomposition only succeeds for a positive definite
+            # Hessian, which is what Minuit calls an accurate covariance.
+            np.linalg.cholesky(hessian)
+            self._accurate = True
+        except np.linalg.LinAlgError:
+            self._accurate = False
+        self._covariance = 2 * self.errordef * np.linalg.pinv(hessian)
+        self._errors = np.abs(self._covariance.diagonal()) ** 0.5
+        return self
+
+    def _hessian(self, x):
+        """The exact Hessian if the cost function provides it.
+
+        Otherwise, use finite differences of the gradient or of the function.
+        """
+        if hasattr(self._fcn, "hessian"):
+            return self._fcn.hessian(x)
+        if hasattr(self._fcn, "least_squares"):
+            A = self._fcn.least_squares[0]
+            return A.T.dot(A)
+        n = len(x)
+        h = np.where(self._errors > 0, 0.1 * self._errors, 1e-6)
+        hessian = np.empty((n, n))
+        if hasattr(self._fcn, "grad"):
+            for i in range(n):
+                dx = np.zeros(n)
+                dx[i] = h[i]
+                g_up = self._call_grad(x + dx)
+                g_down = self._call_grad(x - dx)
+                hessian[i] = (g_up - g_down) / (2 * h[i])
+            return (hessian + hessian.T) / 2
+        for i in range(n):
+            for j in range(i, n):
+                di = np.zeros(n)
+                dj = np.zeros(n)
+                di[i] = h[i]
+                dj[j] = h[j]
+                hessian[i, j] = (
+                    self._call_fcn(x + di + dj)
+                    - self._call_fcn(x + di - dj)
+                    - self._call_fcn(x - di + dj)
+                    + self._call_fcn(x - di - dj)
+                ) / (4 * h[i] * h[j])
+                hessian[j, i] = hessian[i, j]
+        return hessian
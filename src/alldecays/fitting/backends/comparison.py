@@ -0,0 +1,80 @@
+"""Comparison harness for the minimizer backends."""
+import time
+
+import numpy as np
+import pandas as pd
+
+from alldecays.exceptions import FitException
+
+
+def compare_backends(
+    data_set,
+    backends=None,
+    fit_mode=None,
+    has_limits=False,
+    n_repeat=10,
+):
+    """Run the same fit with different minimizer backends.
+
+    The first backend serves as reference for the differences in the
+    physics values and errors.
+
+    Example:
+        >>> from alldecays.fitting.backends import compare_backends
+        >>> compare_backends(data_set, ["Minuit", "L-BFGS-B", "lsq_linear"])
+
+    Args:
+        data_set: An AbstractDataSet object.
+        backends: Names or classes of the backends to compare.
+            Defaults to all `available_backends`.
+        fit_mode: Passed to `Fit`.
+        has_limits: Passed to `Fit`.
+        n_repeat: The fit time is averaged over this number of fits.
+
+    Returns:
+        pandas.DataFrame: One row per backend.
+            Backends that are not applicable to the fit mode have NaN entries.
+    """
+    # Avoid a circular import: the fitting module depends on the backends.
+    from alldecays.fitting.fit import Fit
+
+    from . import available_backends
+
+    if backends is None:
+        backends = list(available_backends)
+    rows = {}
+    reference = None
+    for backend in backends:
+        name = backend if isinstance(backend, str) else backend.__name__
+        try:
+            start_time = time.perf_counter()
+            for _ in range(n_repeat):
+                fit = Fit(
+                    data_set,
+                    fit_mode=fit_mode,
+                    backend=backend,
+                    has_limits=has_limits,
+                    raise_invalid_fit_exception=False,
+                    print_brs_sum_not_1=False,
+                )
+            fit_time = (time.perf_counter() - start_time) / n_repeat
+        except FitException as fe:
+            print(f"INFO: Backend {name} skipped: {fe}")
+            rows[name] = {}
+            continue
+        values = fit.fit_mode.values
+        errors = fit.fit_mode.errors
+        if reference is None:
+            reference = values, errors
+        rows[name] = {
+            "time [ms]": 1000 * fit_time,
+            "nfcn": fit.Minuit.nfcn,
+            "fval": fit.Minuit.fval,
+            "valid": fit.Minuit.valid,
+            "accurate": fit.Minuit.accurate,
+            "max |Δvalue| / error": np.max(
+                np.abs(values - reference[0]) / reference[1]
+            ),
+            "max |error / ref. error - 1|": np.max(np.abs(errors / reference[1] - 1)),
+        }
+    return pd.DataFrame.from_dict(rows, orient="index").reindex(list(rows))
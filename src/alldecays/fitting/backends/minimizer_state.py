@@ -0,0 +1,99 @@
+"""Save and restore the state of a minimizer without its cost function."""
+import numpy as np
+from iminuit import Minuit
+
+# Together, these define the parameters and the result of a Minuit object.
+# They are not part of the public iminuit API (iminuit is pinned to 2.x).
+# If they are missing, only the public parameter state is kept,
+# see `_restore_public_minuit_state`.
+_minuit_attributes = [
+    "_strategy",
+    "_tolerance",
+    "_precision",
+    "_fmin",
+    "_covariance",
+    "_init_state",
+    "_last_state",
+    "_merrors",
+]
+
+
+def _get_public_minuit_state(minuit):
+    return dict(
+        parameters=minuit.parameters,
+        values=np.array(minuit.values),
+        errors=np.array(minuit.errors),
+        limits=list(minuit.limits),
+        fixed=list(minuit.fixed),
+        strategy=minuit.strategy.strategy,
+        tol=minuit.tol,
+        has_minimum=minuit.fmin is not None,
+        has_covariance=minuit.covariance is not None,
+    )
+
+
+def _get_full_minuit_state(minuit):
+    """The complete state (including the minimum), or None if not available."""
+    try:
+        state = {name: getattr(minuit, name) for name in _minuit_attributes}
+        state["nfcn"] = minuit._fcn._nfcn
+        state["ngrad"] = minuit._fcn._ngrad
+    except AttributeError:
+        return None
+    return state
+
+
+def get_minimizer_state(minimizer):
+    """Picklable state of a minimizer, without the cost function.
+
+    The cost functions of the fit plugins are closures, which cannot be
+    pickled. They are recreated and passed to `restore_minimizer` instead.
+    """
+    if isinstance(minimizer, Minuit):
+        state = _get_public_minuit_state(minimizer)
+        state["full"] = _get_full_minuit_state(minimizer)
+        return Minuit, state
+    # AbstractMinimizer drops its cost function from the pickled state.
+    return type(minimizer), minimizer
+
+
+def _restore_full_minuit_state(minuit, full_state):
+    if full_state is None or not all(
+        hasattr(minuit, name) for name in _minuit_attributes
+    ):
+        return False
+    for name in _minuit_attributes:
+        setattr(minuit, name, full_state[name])
+    minuit._fcn._nfcn = full_state["nfcn"]
+    minuit._fcn._ngrad = full_state["ngrad"]
+    return True
+
+
+def _restore_public_minuit_state(minuit, state):
+    """Set the parameters, and find the minimum again if there was one.
+
+    MIGRAD starts at the stored minimum, so this is fast.
+    Function call counters and the exact minimum state are not preserved.
+    """
+    minuit.values = state["values"]
+    minuit.errors = state["errors"]
+    minuit.limits = state["limits"]
+    minuit.fixed = state["fixed"]
+    minuit.strategy = state["strategy"]
+    minuit.tol = state["tol"]
+    if state["has_minimum"]:
+        minuit.migrad()
+    elif state["has_covariance"]:
+        minuit.hesse()
+
+
+def restore_minimizer(fcn, backend, state):
+    """Recreate the minimizer from `get_minimizer_state` for the cost function."""
+    if backend is Minuit:
+        parameters = state["parameters"]
+        minimizer = Minuit(fcn, [0.0] * len(parameters), name=parameters)
+        if not _restore_full_minuit_state(minimizer, state["full"]):
+            _restore_public_minuit_state(minimizer, state)
+        return minimizer
+    state._fcn = fcn
+    return state
@@ -0,0 +1,76 @@
+"""Newton minimizer backend for convex cost functions."""
+import numpy as np
+
+from alldecays.exceptions import FitException
+
+from .abstract_minimizer import AbstractMinimizer
+
+
+class NewtonMinimizer(AbstractMinimizer):
+    """Projected Newton method with a backtracking line search.
+
+    Requires a cost function with exact gradient and Hessian
+    (`fcn.grad`, `fcn.hessian`), as provided by the `Poisson` fit mode.
+    For a convex cost function like the Poisson likelihood of a linear model,
+    the minimum is found in a handful of iterations.
+
+    Parameters are projected onto their `limits`, e.g. non-negative
+    branching ratios for `Poisson(has_limits=True)`.
+    Parameters at a limit whose gradient points outwards are held fixed
+    for the Newton step (active set).
+    The covariance is obtained from the exact Hessian at the minimum.
+    """
+
+    max_iterations = 100
+
+    def __init__(self, fcn, start):
+        if not (hasattr(fcn, "grad") and hasattr(fcn, "hessian")):
+            raise FitException(
+                f"{self.__class__.__name__} requires a cost function "
+                "with exact gradient and Hessian (`fcn.grad`, `fcn.hessian`)."
+            )
+        super().__init__(fcn, start)
+
+    def _minimize(self, ncall):
+        lower, upper = np.array(self._limits).T
+        edm_goal = 2e-6 * self.tol * self.errordef
+        x = np.clip(self._values, lower, upper)
+        f_x = self._call_fcn(x)
+        self._valid = False
+        for _ in range(self.max_iterations):
+            g = self._call_grad(x)
+            active = ((x <= lower) & (g > 0)) | ((x >= upper) & (g < 0))
+            free = ~active
+            step = np.zeros_like(x)
+            try:
+                step[free] = np.linalg.solve(
+                    self._fcn.hessian(x)[np.ix_(free, free)], -g[free]
+                )
+            except np.linalg.LinAlgError:
+                break
+            edm = -0.5 * g.dot(step)
+            if edm < edm_goal:
+                # The last step is cheap, and it is where Newton's method
+                # converges quadratically: Afterwards, the gradient vanishes.
+                x_new = np.clip(x + step, lower, upper)
+                f_new = self._call_fcn(x_new)
+                if np.isfinite(f_new) and f_new <= f_x:
+                    x, f_x = x_new, f_new
+                self._valid = np.isfinite(f_x)
+                break
+            t = 1.0
+            while t > 1e-10:
+                x_new = np.clip(x + t * step, lower, upper)
+                f_new = self._call_fcn(x_new)
+                # Armijo condition. Non-finite values (e.g. negative Poisson
+                # expectations outside of the limits) lead to a shorter step.
+                if np.isfinite(f_new) and f_new <= f_x + 1e-4 * g.dot(x_new - x):
+                    break
+                t /= 2
+            else:
+                break
+            x, f_x = x_new, f_new
+            if ncall and self._nfcn >= ncall:
+                break
+        self._values = x
+        self._fval = float(f_x)
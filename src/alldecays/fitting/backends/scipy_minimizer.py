@@ -0,0 +1,135 @@
+"""Minimizer backends based on scipy.optimize."""
+from typing import Optional
+
+import numpy as np
+from scipy.optimize import BFGS, Bounds, lsq_linear, minimize
+
+from alldecays.exceptions import FitException
+
+from .abstract_minimizer import AbstractMinimizer
+
+
+class ScipyMinimizer(AbstractMinimizer):
+    """Minimization with one of the `scipy.optimize.minimize` methods.
+
+    As in Minuit, `errors` are the step sizes before the minimization.
+    They are used to bring all parameters to a similar scale,
+    which matters for branching ratios that span several orders of magnitude.
+    """
+
+    method: Optional[str] = None
+
+    def _options(self, ncall, scale):
+        """Keyword arguments for `scipy.optimize.minimize`."""
+        raise NotImplementedError
+
+    def _minimize(self, ncall):
+        scale = np.where(self._errors > 0, self._errors, 1.0)
+        lower, upper = np.array(self._limits).T
+
+        def scaled_fcn(u):
+            return self._call_fcn(u * scale)
+
+        if hasattr(self._fcn, "grad"):
+
+            def scaled_jac(u):
+                return self._call_grad(u * scale) * scale
+
+        else:
+            scaled_jac = None
+        result = minimize(
+            scaled_fcn,
+            self._values / scale,
+            method=self.method,
+            jac=scaled_jac,
+            bounds=Bounds(lower / scale, upper / scale),
+            **self._options(ncall, scale),
+        )
+        self._values = np.array(result.x) * scale
+        self._fval = float(result.fun)
+        self._valid = np.isfinite(self._fval) and (
+            bool(result.success) or self._edm_below_goal()
+        )
+        self._scipy_result = result
+
+    def _edm_below_goal(self):
+        """Minuit's convergence criterion, for a second opinion.
+
+        The line searches of scipy can stop with an abnormal status close to
+        the minimum, when the cost function differences reach float precision.
+        """
+        if not hasattr(self._fcn, "grad"):
+            return False
+        g = self._call_grad(self._values)
+        try:
+            edm = 0.5 * g.dot(np.linalg.solve(self._hessian(self._values), g))
+        except np.linalg.LinAlgError:
+            return False
+        return edm < 0.002 * self.tol * self.errordef
+
+
+class LBFGSBMinimizer(ScipyMinimizer):
+    """Limited-memory BFGS with bounds.
+
+    Needs few function calls if the cost function provides its gradient.
+    """
+
+    method = "L-BFGS-B"
+
+    def _options(self, ncall, scale):
+        options = dict(ftol=1e-8 * self.tol, gtol=1e-6 * self.tol)
+        if ncall:
+            options["maxfun"] = ncall
+        return dict(options=options)
+
+
+class TrustConstrMinimizer(ScipyMinimizer):
+    """Trust-region method, using the exact Hessian if available."""
+
+    method = "trust-constr"
+
+    def _options(self, ncall, scale):
+        if hasattr(self._fcn, "hessian"):
+
+            def hess(u):
+                return self._fcn.hessian(u * scale) * np.outer(scale, scale)
+
+        else:
+            hess = BFGS()
+        options = dict(gtol=1e-6 * self.tol, xtol=1e-10)
+        if ncall:
+            options["maxiter"] = ncall
+        return dict(hess=hess, options=options)
+
+
+class LinearLeastSquaresMinimizer(AbstractMinimizer):
+    """Direct solution of a linear least squares problem.
+
+    Uses `scipy.optimize.lsq_linear` (bounded-variable least squares).
+    For limits `(0, inf)` this is a non-negative least squares (NNLS) fit.
+    Only available for fit modes that expose their cost function as
+    `fcn.least_squares = (A, b)`, i.e. the least squares fit modes.
+    """
+
+    def __init__(self, fcn, start):
+        if not hasattr(fcn, "least_squares"):
+            raise FitException(
+                f"{self.__class__.__name__} requires a linear least squares "
+                "cost function (`fcn.least_squares`)."
+            )
+        super().__init__(fcn, start)
+
+    def _minimize(self, ncall):
+        A, b = self._fcn.least_squares
+        lower, upper = np.array(self._limits).T
+        result = lsq_linear(
+            A,
+            b,
+            bounds=(lower, upper),
+            method="bvls",
+            max_iter=ncall if ncall else None,
+        )
+        self._values = np.array(result.x)
+        self._fval = float(self._call_fcn(self._values))
+        self._valid = result.status > 0 and np.isfinite(self._fval)
+        self._scipy_result = result
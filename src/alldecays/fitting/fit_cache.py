@@ -0,0 +1,237 @@
+"""Opt-in on-disk memoization of `Fit` construction and `Fit.fill_toys`.
+
+The results are keyed by the fingerprint of the data set
+(which reflects the channel files, BRs, luminosities, polarizations and
+signal scalers), the fit configuration and the state of the random generator.
+Entries are pickled files. Only use cache directories that you trust.
+"""
+import os
+import pickle
+from pathlib import Path
+
+from iminuit import Minuit
+
+from ..data_handling.channel_cache import get_fingerprint
+from ..util import _write_atomic
+from ..version import __version__
+from .backends import get_backend
+from .fit import Fit, default_fit_mode, get_fit_step
+from .plugins import get_fit_mode
+
+
+def _callable_name(function):
+    """Module and name of a function, or None if it cannot be identified."""
+    qualname = getattr(function, "__qualname__", "<unknown>")
+    if "<" in qualname:  # Lambdas and functions defined in other functions.
+        return None
+    return f"{function.__module__}.{qualname}"
+
+
+def _rng_state(rng):
+    """The (JSON serializable) state of a numpy Generator, or None."""
+    if rng is None:
+        return None
+    return rng.bit_generator.state
+
+
+class FitCache:
+    """A size-bounded on-disk cache of fits and toy studies.
+
+    Example:
+        >>> cache = FitCache("fit_cache", max_bytes=2**30)
+        >>> fit = cache.fit(data_set, fit_mode="Poisson")
+        >>> cache.fill_toys(fit, n_toys=1000, rng=np.random.default_rng(1))
+
+    `cache.fit` and `cache.fill_toys` take the same arguments as
+    `Fit` and `Fit.fill_toys`. On a cache hit, the stored result is returned
+    and the random generator is advanced to the state that the computation
+    would have left it in.
+    Results are only cached if they are reproducible: The random generator
+    must be given (toys), and custom fit steps must be module-level functions.
+
+    When the total size of the entries exceeds `max_bytes`,
+    the least recently used entries are removed.
+    """
+
+    def __init__(self, directory, max_bytes=2**30):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}({str(self.directory)!r}, "
+            f"{self.hits} hits, {self.misses} misses)"
+        )
+
+    def _get_key(self, **content):
+        # Some bit generators (e.g. MT19937) have arrays in their state,
+        # which `get_fingerprint` serializes as lists.
+        return get_fingerprint(alldecays=__version__, **content)
+
+    def _load(self, key):
+        path = self.directory / f"{key}.pkl"
+        try:
+            with path.open("rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(path)  # Mark as recently used.
+        self.hits += 1
+        return entry
+
+    def _store(self, key, entry):
+        _write_atomic(
+            self.directory / f"{key}.pkl",
+            lambda f: pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL),
+        )
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until within `max_bytes`."""
+        entries = []
+        for path in self.directory.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # Removed by another process.
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+    def clear(self):
+        for path in self.directory.glob("*.pkl"):
+            path.unlink(missing_ok=True)
+
+    def _fit_config(self, fit_mode, backend, fit_step, has_limits, analytic_covariance):
+        config = {
+            "fit_mode": _callable_name(get_fit_mode(fit_mode)),
+            "backend": _callable_name(get_backend(backend)),
+            "has_limits": has_limits,
+            "analytic_covariance": analytic_covariance,
+        }
+        if fit_step is not None:
+            config["fit_step"] = _callable_name(get_fit_step(fit_step))
+        return config
+
+    def fit(
+        self,
+        data_set,
+        fit_mode=None,
+        fit_step=None,
+        use_expected_counts=True,
+        rng=None,
+        has_limits=False,
+        raise_invalid_fit_exception=True,
+        print_brs_sum_not_1=True,
+        backend=None,
+        analytic_covariance=False,
+    ):
+        """Memoized `Fit(data_set, ...)`."""
+        fit_kwargs = dict(
+            fit_mode=fit_mode,
+            fit_step=fit_step,
+            use_expected_counts=use_expected_counts,
+            rng=rng,
+            has_limits=has_limits,
+            raise_invalid_fit_exception=raise_invalid_fit_exception,
+            print_brs_sum_not_1=print_brs_sum_not_1,
+            backend=backend,
+            analytic_covariance=analytic_covariance,
+        )
+        config = self._fit_config(
+            default_fit_mode if fit_mode is None else fit_mode,
+            Minuit if backend is None else backend,
+            fit_step,
+            has_limits,
+            analytic_covariance,
+        )
+        # Only fits to toy counts draw from the random generator.
+        uses_rng = not use_expected_counts
+        rng_state = _rng_state(rng) if uses_rng else None
+        if None in config.values() or (uses_rng and rng is None):
+            return Fit(data_set, **fit_kwargs)
+
+        key = self._get_key(
+            kind="fit",
+            data_set=data_set.fingerprint,
+            use_expected_counts=use_expected_counts,
+            rng=rng_state,
+            raise_invalid_fit_exception=raise_invalid_fit_exception,
+            **config,
+        )
+        entry = self._load(key)
+        if entry is None:
+            fit = Fit(data_set, **fit_kwargs)
+            self._store(key, {"fit": fit, "rng": _rng_state(rng) if uses_rng else None})
+            return fit
+        fit = entry["fit"]
+        # Keep the link to the caller's data set (e.g. for the channel plots).
+        fit._data_set = data_set
+        fit.fit_mode._data_set = data_set
+        fit.fit_mode.rng = rng
+        if uses_rng:
+            rng.bit_generator.state = entry["rng"]
+        return fit
+
+    def fill_toys(
+        self,
+        fit,
+        n_toys=100,
+        rng=None,
+        store_channel_counts=False,
+        warm_start=False,
+        warm_start_covariance=False,
+        fit_step=None,
+    ):
+        """Memoized `fit.fill_toys(...)`."""
+        toy_kwargs = dict(
+            n_toys=n_toys,
+            rng=rng,
+            store_channel_counts=store_channel_counts,
+            warm_start=warm_start,
+            warm_start_covariance=warm_start_covariance,
+            fit_step=fit_step,
+        )
+        if rng is None:
+            rng = fit.fit_mode.rng
+        config = self._fit_config(
+            type(fit.fit_mode),
+            type(fit.Minuit),
+            fit._fit_step if fit_step is None else fit_step,
+            fit.fit_mode.has_limits,
+            fit.fit_mode._analytic_covariance,
+        )
+        if None in config.values() or rng is None:
+            return fit.fill_toys(**toy_kwargs)
+
+        if warm_start or warm_start_covariance:
+            # The toy fits start from the minimum of `fit`.
+            start = [list(fit.Minuit.values), list(fit.Minuit.errors)]
+        else:
+            start = None
+        key = self._get_key(
+            kind="toys",
+            fit_problem=fit.fit_mode._fit_problem.fingerprint,
+            raise_invalid_fit_exception=fit._raise_invalid_fit_exception,
+            n_toys=n_toys,
+            store_channel_counts=store_channel_counts,
+            warm_start=[start, warm_start_covariance],
+            rng=_rng_state(rng),
+            **config,
+        )
+        entry = self._load(key)
+        if entry is None:
+            toys = fit.fill_toys(**toy_kwargs)
+            self._store(key, {"toys": toys, "rng": _rng_state(rng)})
+            return toys
+        fit.toys = entry["toys"]
+        rng.bit_generator.state = entry["rng"]
+        return fit.toys
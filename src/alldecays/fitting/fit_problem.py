@@ -0,0 +1,156 @@
+"""Compiled, immutable numpy representation of a data set for the fit."""
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ..util import _read_only
+
+
+@dataclass(frozen=True, eq=False)
+class FitProblem:
+    """The arrays that the fit plugins build their likelihoods from.
+
+    The expected box counts are modelled as
+        nu = signal_matrix @ brs + bkg_vector.
+    The boxes of all channels are stacked in the order of `channel_names`.
+    The fit starts from `fit_start_brs`.
+
+    Created once from any `AbstractDataSet` with `FitProblem.from_data_set`.
+    Later changes to the data set do not propagate to the FitProblem.
+    The arrays are contiguous and read-only, which makes the object cheap to
+    share between fits (e.g. toy fits), to pickle and to compare by
+    its `fingerprint`. `data_set_fingerprint` records the data set that
+    the problem was compiled from (None for problems built by hand).
+    A FitProblem can be passed to `Fit` in place of the data set,
+    e.g. in worker processes (see `SharedFitProblem`).
+    Plotting functions that need the channels are not available for such fits.
+    """
+
+    decay_names: Tuple[str, ...]
+    channel_names: Tuple[str, ...]
+    box_names: Tuple[Tuple[str, ...], ...]
+    signal_matrix: np.ndarray
+    bkg_vector: np.ndarray
+    expected_counts: np.ndarray
+    fit_start_brs: np.ndarray
+    data_set_fingerprint: Optional[str] = None
+    fingerprint: str = field(init=False)
+
+    _array_fields = (
+        "signal_matrix",
+        "bkg_vector",
+        "expected_counts",
+        "fit_start_brs",
+    )
+
+    def __post_init__(self):
+        # The dataclass is frozen: object.__setattr__ is needed in here.
+        for name in ["decay_names", "channel_names"]:
+            object.__setattr__(self, name, tuple(map(str, getattr(self, name))))
+        box_names = tuple(tuple(map(str, names)) for names in self.box_names)
+        object.__setattr__(self, "box_names", box_names)
+        for name in self._array_fields:
+            object.__setattr__(self, name, _read_only(getattr(self, name)))
+
+        n_boxes = sum(len(names) for names in self.box_names)
+        if self.signal_matrix.shape != (n_boxes, len(self.decay_names)):
+            raise ValueError(
+                f"{self.signal_matrix.shape=} does not match "
+                f"{n_boxes=} and {len(self.decay_names)=}."
+            )
+        box_shape = (n_boxes,)
+        if (
+            self.bkg_vector.shape != box_shape
+            or self.expected_counts.shape != box_shape
+        ):
+            raise ValueError(
+                f"{self.bkg_vector.shape=}, {self.expected_counts.shape=}."
+            )
+        if self.fit_start_brs.shape != (len(self.decay_names),):
+            raise ValueError(f"{self.fit_start_brs.shape=}.")
+        object.__setattr__(self, "fingerprint", self._get_fingerprint())
+
+    def __setstate__(self, state):
+        # Unpickled arrays own their (writeable) data.
+        self.__dict__.update(state)
+        for name in self._array_fields:
+            getattr(self, name).setflags(write=False)
+
+    def _get_fingerprint(self):
+        h = hashlib.sha256()
+        names = [self.decay_names, self.channel_names, self.box_names]
+        h.update(json.dumps(names).encode())
+        for name in self._array_fields:
+            h.update(getattr(self, name).tobytes())
+        return h.hexdigest()
+
+    @classmethod
+    def from_data_set(cls, data_set):
+        """Compile the current state of a DataSet-like object."""
+        channels = data_set.get_channels()
+        signal_blocks = []
+        bkg_blocks = []
+        expected_blocks = []
+        for channel in channels.values():
+            # Cached by the channels: Only changed channels are recomputed.
+            signal, bkg = channel._get_fit_blocks()
+            signal_blocks.append(signal)
+            bkg_blocks.append(bkg)
+            expected_blocks.append(channel._get_expected_counts_array())
+        n_decays = len(data_set.decay_names)
+        return cls(
+            decay_names=data_set.decay_names,
+            channel_names=list(channels),
+            box_names=[channel.box_names for channel in channels.values()],
+            signal_matrix=np.concatenate(signal_blocks).reshape(-1, n_decays),
+            bkg_vector=np.concatenate(bkg_blocks),
+            expected_counts=np.concatenate(expected_blocks),
+            fit_start_brs=data_set.fit_start_brs,
+            data_set_fingerprint=data_set.fingerprint,
+        )
+
+    @property
+    def n_boxes(self):
+        return len(self.bkg_vector)
+
+    @property
+    def channel_slices(self):
+        """The rows of each channel in the stacked arrays."""
+        slices = {}
+        i_stop = 0
+        for name, box_names in zip(self.channel_names, self.box_names):
+            i_start = i_stop
+            i_stop = i_start + len(box_names)
+            slices[name] = slice(i_start, i_stop)
+        return slices
+
+    def split_by_channel(self, box_values):
+        """Dict of the per-channel parts of an array over all boxes."""
+        return {name: box_values[s] for name, s in self.channel_slices.items()}
+
+    def draw_toy_counts(self, rng=None):
+        """Smear the expected counts of each channel (see `get_toys`).
+
+        The channels are drawn in order, each from a multinomial distribution
+        with the channel's expected number of events.
+        This consumes the random stream as `_DataChannel.get_toys` does.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        y = np.empty(self.n_boxes)
+        for s in self.channel_slices.values():
+            expected_counts = self.expected_counts[s]
+            n_data = int(expected_counts.sum())
+            box_probabilities = expected_counts / expected_counts.sum()
+            y[s] = rng.multinomial(n_data, box_probabilities)
+        return y
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__} with {len(self.channel_names)} channels, "
+            f"{self.n_boxes} boxes and {len(self.decay_names)} decays "
+            f"(fingerprint {self.fingerprint[:12]})."
+        )
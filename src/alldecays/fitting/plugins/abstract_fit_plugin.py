@@ -1,13 +1,30 @@
 """The interface defining class for fit modes."""
 from abc import ABC, abstractmethod
+from copy import copy
 
 import numpy as np
 from iminuit import Minuit
 
+from ..backends import get_backend
+from ..backends.minimizer_state import get_minimizer_state, restore_minimizer
+from ..fit_problem import FitProblem
+
 
 class AbstractFitPlugin(ABC):
     """Minuit wrapper to standardize usage with different likelihood function
     definitions and parameter transformations.
+
+    Args:
+        backend: The minimizer that is stored as `self.Minuit`.
+            Name or class from `alldecays.fitting.backends.available_backends`.
+            Default: `iminuit.Minuit`.
+        analytic_covariance: If True, `covariance` is computed from the exact
+            Hessian of the cost function at the minimum (`fcn.hessian`),
+            instead of being taken from the minimizer (HESSE).
+
+    Fit plugins can be pickled. The cost function is not part of the state:
+    it is rebuilt from the FitProblem and the box counts on unpickling,
+    and the minimizer state (e.g. the Minuit result) is restored on top.
     """
 
     def __init__(
@@ -17,17 +34,26 @@ class AbstractFitPlugin(ABC):
         rng=None,
         has_limits=False,
         print_brs_sum_not_1=True,
-        _precalculated_M=None,  # Can be inherited in toy studies,
+        _fit_problem=None,  # Can be inherited in toy studies,
+        backend=None,
+        analytic_covariance=False,
     ):
         self._data_set = data_set
+        self._analytic_covariance = analytic_covariance
         self._use_expected_counts = use_expected_counts
         self.rng = rng
-        self._precalculated_M = _precalculated_M
+        if _fit_problem is None and isinstance(data_set, FitProblem):
+            _fit_problem = data_set
+        self._fit_problem = _fit_problem
+        self._y = None
         self._counts = {}
 
-        fcn = self._create_likelihood()
+        fcn = self._get_fcn()
+        self._fcn = fcn
         internal_starters = self.transform_to_internal(data_set.fit_start_brs)
-        self.Minuit = Minuit(fcn, internal_starters)
+        if backend is None:
+            backend = Minuit
+        self.Minuit = get_backend(backend)(fcn, internal_starters)
         self.has_limits = has_limits
 
         if not self._enforces_brs_sum_to_1 and print_brs_sum_not_1:
@@ -41,14 +67,81 @@ class AbstractFitPlugin(ABC):
     def __repr__(self):
         return self.__class__.__name__
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_fcn"]
+        del state["_counts"]  # Views on `_y`.
+        # The FitProblem holds everything the likelihood is built from.
+        # The data set (with all its channels) is not needed and not pickled.
+        del state["_data_set"]
+        state["Minuit"] = get_minimizer_state(self.Minuit)
+        return state
+
+    def __setstate__(self, state):
+        backend, minimizer_state = state.pop("Minuit")
+        self.__dict__.update(state)
+        self._data_set = self._fit_problem
+        self._fcn = self._get_fcn()
+        self.Minuit = restore_minimizer(self._fcn, backend, minimizer_state)
+
     @property
     def errors(self):
         return np.array(self.covariance).diagonal() ** 0.5
 
+    @property
+    def accurate(self):
+        """Whether the covariance can be trusted.
+
+        For the analytic covariance, this requires a positive definite Hessian.
+        """
+        if not self._analytic_covariance:
+            return self.Minuit.accurate
+        try:
+            np.linalg.cholesky(self._fcn.hessian(np.array(self.Minuit.values)))
+        except np.linalg.LinAlgError:
+            return False
+        return True
+
+    def get_analytic_covariance(self):
+        """The covariance of the physics parameters from the exact Hessian.
+
+        The Hessian of the cost function is evaluated at the current minimum
+        in the internal parameter space and propagated to the physics space:
+            V_physics = J V_internal Jᵀ,  J = ∂physics / ∂internal.
+        Contrary to HESSE, no numerical differentiation is involved,
+        and the result is bitwise reproducible.
+        """
+        internal_values = np.array(self.Minuit.values)
+        hessian = self._fcn.hessian(internal_values)
+        internal_covariance = 2 * self._fcn.errordef * np.linalg.inv(hessian)
+        J = self._jacobian_to_physics(internal_values)
+        return J.dot(internal_covariance).dot(J.T)
+
+    def _jacobian_to_physics(self, internal_values):
+        """The Jacobian ∂physics / ∂internal of the parameter transformation.
+
+        Must be overwritten by plugins for which `transform_to_internal`
+        is not the identity.
+        """
+        return np.eye(len(internal_values))
+
     @abstractmethod
     def _create_likelihood(self):
         pass
 
+    def _get_fcn(self):
+        """The likelihood, with its analytic derivatives hidden from MIGRAD.
+
+        iminuit uses `fcn.grad` and `fcn.hessian` on its own
+        unless `fcn.has_grad` and `fcn.has_hessian` are False.
+        MIGRAD stays on numerical derivatives; `grad` and `hessian` are for the
+        other backends and the analytic covariance.
+        """
+        fcn = self._create_likelihood()
+        fcn.has_grad = False
+        fcn.has_hessian = False
+        return fcn
+
     @abstractmethod
     def transform_to_internal(self, values):
         pass
@@ -92,54 +185,48 @@ class AbstractFitPlugin(ABC):
             inf = float("infinity")
             self.Minuit.limits = [(-inf, inf)] * len(self.Minuit.limits)
 
+    def warm_start(self, minuit, use_covariance=False):
+        """Seed the minimizer with the result of a previous fit.
+
+        The values and step sizes (`Minuit.errors`) are taken from `minuit`.
+        With `use_covariance=True`, MIGRAD is also seeded with the covariance
+        estimate of `minuit` instead of building its own first approximation.
+        This is only possible if both fits use the Minuit backend.
+        """
+        both_minuit = isinstance(self.Minuit, Minuit) and isinstance(minuit, Minuit)
+        if (
+            use_covariance
+            and both_minuit
+            and minuit.covariance is not None
+            # Not public iminuit API: Fall back to values and errors without it.
+            and hasattr(minuit, "_last_state")
+            and hasattr(self.Minuit, "_last_state")
+        ):
+            # The parameter state (values, errors, limits and covariance) is
+            # the seed that Minuit.migrad passes on to Minuit2.
+            self.Minuit._last_state = copy(minuit._last_state)
+        else:
+            self.Minuit.values = minuit.values
+            self.Minuit.errors = minuit.errors
+
     @property
     @abstractmethod
     def _enforces_brs_sum_to_1(self) -> bool:
         """A True/False hook to allow some relaxing for sub-ideal likelihood descriptions."""
         pass
 
-    def _prepare_numpy_y_M(self):
-        """Prepare the MC counts matrix and box counts as numpy arrays."""
-        data_set = self._data_set
-
-        n_boxes_per_channel = {
-            k: len(ch.box_names) for k, ch in data_set.get_channels().items()
-        }
-        n_boxes = sum(n_boxes_per_channel.values())
-        n_bkg = 1
-        y = np.empty(n_boxes)
-
-        if self._precalculated_M is None:
-            n_parameters = len(data_set.decay_names)
-            M = np.empty((n_boxes, n_parameters + n_bkg))
-
-        i_stop = 0
-        for name, channel in data_set.get_channels().items():
-            i_start = i_stop
-            i_stop = i_start + n_boxes_per_channel[name]
+    def _prepare_y(self):
+        """Compile the FitProblem (if not inherited) and get the box counts y.
 
-            # Fill y (in every toy)
+        The counts are only chosen (or drawn) once: When the likelihood is
+        rebuilt (e.g. after unpickling), the same y is returned.
+        """
+        if self._fit_problem is None:
+            self._fit_problem = FitProblem.from_data_set(self._data_set)
+        if self._y is None:
             if self._use_expected_counts:
-                self._counts[name] = channel.get_expected_counts()
+                self._y = self._fit_problem.expected_counts
             else:
-                self._counts[name] = channel.get_toys(rng=self.rng)
-            y[i_start:i_stop] = self._counts[name]
-
-            # Fill M (if necessary)
-            if self._precalculated_M is None:
-                signal_factor = channel.signal_cs_default * channel.signal_scaler
-                M[i_start:i_stop, :-n_bkg] = channel.mc_matrix[channel.decay_names]
-                M[i_start:i_stop, :-n_bkg] *= signal_factor
-
-                bkg_box_probabilities = (
-                    channel.mc_matrix[channel.bkg_names]
-                    * channel.bkg_cs_default
-                    / channel.bkg_cs_default.sum()
-                ).sum(axis=1)
-                M[i_start:i_stop, -n_bkg] = bkg_box_probabilities
-                M[i_start:i_stop, -n_bkg] *= channel.bkg_cs_default.sum()
-                M[i_start:i_stop, :] *= channel.luminosity_ifb
-
-        if self._precalculated_M is None:
-            self._precalculated_M = M
-        return y, self._precalculated_M, n_bkg
+                self._y = self._fit_problem.draw_toy_counts(self.rng)
+        self._counts = self._fit_problem.split_by_channel(self._y)
+        return self._y
@@ -16,14 +16,31 @@ class LeastSquares(AbstractFitPlugin):
         raise NotImplementedError
 
     def _create_likelihood(self):
-        y, M, n_bkg = self._prepare_numpy_y_M()
+        y = self._prepare_y()
+        M_sig = self._fit_problem.signal_matrix
+        bkg = self._fit_problem.bkg_vector
         y_variance = self.variance_maker(y)
 
         def fcn(x):
-            f_x = M[:, :-n_bkg].dot(x) + M[:, -n_bkg:].sum(axis=1)
+            f_x = M_sig.dot(x) + bkg
             return 0.5 * (np.power(y - f_x, 2) / y_variance).sum()
 
+        def grad(x):
+            f_x = M_sig.dot(x) + bkg
+            return M_sig.T.dot((f_x - y) / y_variance)
+
+        y_sigma = y_variance**0.5
+        A = M_sig / y_sigma[:, np.newaxis]
+        # The cost function is quadratic: its Hessian is independent of x.
+        constant_hessian = A.T.dot(A)
+
+        def hessian(x):
+            return constant_hessian
+
         fcn.errordef = Minuit.LIKELIHOOD
+        fcn.grad = grad
+        fcn.hessian = hessian
+        fcn.least_squares = (A, (y - bkg) / y_sigma)
         return fcn
 
     def transform_to_internal(self, values):
@@ -46,6 +63,8 @@ class LeastSquares(AbstractFitPlugin):
 
     @property
     def covariance(self):
+        if self._analytic_covariance:
+            return self.get_analytic_covariance()
         if self.Minuit.covariance is None:
             print("WARNING: Covariance not yet calculated by a Minuit fit.")
         return np.array(self.Minuit.covariance)
@@ -6,10 +6,19 @@ from .abstract_fit_plugin import AbstractFitPlugin
 
 
 class Poisson(AbstractFitPlugin):
-    """A Poisson likelihood fit."""
+    """A Poisson likelihood fit.
+
+    With the box expectations `nu = M_sig x + bkg`, the negative
+    log-likelihood is convex in `x`, with the closed-form derivatives
+        gradient = M_sigᵀ (1 - y / nu),
+        Hessian = M_sigᵀ diag(y / nu²) M_sig.
+    They are attached to the cost function, e.g. for the `Newton` backend.
+    """
 
     def _create_likelihood(self):
-        y, M, n_bkg = self._prepare_numpy_y_M()
+        y = self._prepare_y()
+        M_sig = self._fit_problem.signal_matrix
+        bkg = self._fit_problem.bkg_vector
 
         y_mask_log = y != 0
         masking_not_needed = all(y_mask_log)
@@ -23,10 +32,21 @@ class Poisson(AbstractFitPlugin):
         zero_shift = poisson_likelihood(y)
 
         def fcn(x):
-            nu = M[:, :-n_bkg].dot(x) + M[:, -n_bkg:].sum(axis=1)
+            nu = M_sig.dot(x) + bkg
             return poisson_likelihood(nu) - zero_shift
 
+        def grad(x):
+            nu = M_sig.dot(x) + bkg
+            return M_sig.T.dot(1 - y / nu)
+
+        def hessian(x):
+            nu = M_sig.dot(x) + bkg
+            weighted_M = M_sig * (y**0.5 / nu)[:, np.newaxis]
+            return weighted_M.T.dot(weighted_M)
+
         fcn.errordef = Minuit.LIKELIHOOD
+        fcn.grad = grad
+        fcn.hessian = hessian
         return fcn
 
     def transform_to_internal(self, values):
@@ -49,6 +69,8 @@ class Poisson(AbstractFitPlugin):
 
     @property
     def covariance(self):
+        if self._analytic_covariance:
+            return self.get_analytic_covariance()
         if self.Minuit.covariance is None:
             print("WARNING: Covariance not yet calculated by a Minuit fit.")
         return np.array(self.Minuit.covariance)
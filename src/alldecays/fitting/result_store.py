@@ -0,0 +1,267 @@
+"""Persistent storage of fit results and toy studies.
+
+Each entry is an uncompressed `.npz` file with the fit results (and the toys).
+`index.json` holds the configuration metadata of all entries,
+so that entries can be looked up without opening their array files.
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ..util import _write_atomic
+from .toy_values import ToyValues
+
+_store_format_version = 1
+_toy_fields = ["internal", "physics", "valid", "accurate", "nfcn", "fval"]
+
+
+@dataclass(eq=False)
+class StoredFit:
+    """The results of a Fit, as loaded from a `ResultStore`.
+
+    Accepted in place of a Fit by the fit comparison and the toy plots
+    (plots that need the channels of the data set are not available).
+    """
+
+    name: str
+    metadata: dict
+    parameters: Tuple[str, ...]
+    values: np.ndarray
+    errors: np.ndarray
+    covariance: np.ndarray
+    starting_values: np.ndarray
+    internal_parameters: Tuple[str, ...]
+    internal_values: np.ndarray
+    internal_errors: np.ndarray
+    internal_covariance: np.ndarray
+    internal_starting_values: np.ndarray
+    valid: bool
+    accurate: bool
+    fval: float
+    nfcn: int
+    toys: Optional[ToyValues] = None
+
+    @classmethod
+    def from_fit(cls, fit, name="", metadata=None):
+        fit_mode = fit.fit_mode
+        minuit = fit.Minuit
+        n_parameters = len(minuit.values)
+        if minuit.covariance is None and not fit_mode._analytic_covariance:
+            # No covariance (yet), e.g. for `fit_step=lambda x: None`.
+            internal_covariance = np.full((n_parameters, n_parameters), np.nan)
+            covariance = internal_covariance
+        else:
+            internal_covariance = np.array(minuit.covariance, dtype=float)
+            covariance = np.array(fit_mode.covariance, dtype=float)
+        start_brs = fit_mode._data_set.fit_start_brs
+        return cls(
+            name=name,
+            metadata={} if metadata is None else dict(metadata),
+            parameters=tuple(fit_mode.parameters),
+            values=np.array(fit_mode.values, dtype=float),
+            errors=covariance.diagonal() ** 0.5,
+            covariance=covariance,
+            starting_values=np.array(start_brs, dtype=float),
+            internal_parameters=tuple(minuit.parameters),
+            internal_values=np.array(minuit.values, dtype=float),
+            internal_errors=np.array(minuit.errors, dtype=float),
+            internal_covariance=internal_covariance,
+            internal_starting_values=fit_mode.transform_to_internal(start_brs),
+            valid=bool(minuit.valid),
+            accurate=bool(fit_mode.accurate),
+            fval=np.nan if minuit.fval is None else float(minuit.fval),
+            nfcn=int(minuit.nfcn),
+            toys=getattr(fit, "toys", None),
+        )
+
+    def __repr__(self):
+        n_toys = 0 if self.toys is None else len(self.toys)
+        return f"{self.__class__.__name__}({self.name!r}, {n_toys} toys)"
+
+
+def _get_fit_config(fit):
+    """The configuration of a fit that is recorded in the index."""
+    fit_mode = fit.fit_mode
+    toys = getattr(fit, "toys", None)
+    return {
+        "fit_mode": type(fit_mode).__name__,
+        "backend": type(fit.Minuit).__name__,
+        "fit_step": getattr(fit._fit_step, "__qualname__", repr(fit._fit_step)),
+        "has_limits": fit_mode.has_limits,
+        "use_expected_counts": fit_mode._use_expected_counts,
+        "analytic_covariance": fit_mode._analytic_covariance,
+        "data_set": fit_mode._fit_problem.data_set_fingerprint,
+        "fit_problem": fit_mode._fit_problem.fingerprint,
+        "n_toys": 0 if toys is None else len(toys),
+    }
+
+
+def _to_arrays(stored):
+    arrays = {
+        "parameters": np.array(stored.parameters, dtype=str),
+        "internal_parameters": np.array(stored.internal_parameters, dtype=str),
+        "result": np.array([stored.valid, stored.accurate, stored.fval, stored.nfcn]),
+    }
+    for field in [
+        "values",
+        "errors",
+        "covariance",
+        "starting_values",
+        "internal_values",
+        "internal_errors",
+        "internal_covariance",
+        "internal_starting_values",
+    ]:
+        arrays[field] = np.asarray(getattr(stored, field), dtype=float)
+    if stored.toys is not None:
+        for field in _toy_fields:
+            arrays[f"toys_{field}"] = getattr(stored.toys, field)
+        channel_counts = stored.toys._channel_counts
+        if channel_counts:
+            channel_names = list(channel_counts[0])
+            arrays["toys_channel_names"] = np.array(channel_names, dtype=str)
+            for i, channel_name in enumerate(channel_names):
+                arrays[f"toys_channel_counts_{i}"] = np.array(
+                    [cc[channel_name] for cc in channel_counts]
+                )
+    return arrays
+
+
+def _from_arrays(name, metadata, arrays):
+    valid, accurate, fval, nfcn = arrays["result"]
+    if "toys_physics" in arrays:
+        channel_counts = None
+        if "toys_channel_names" in arrays:
+            channel_names = list(map(str, arrays["toys_channel_names"]))
+            counts = [
+                arrays[f"toys_channel_counts_{i}"] for i in range(len(channel_names))
+            ]
+            channel_counts = [
+                dict(zip(channel_names, toy_counts)) for toy_counts in zip(*counts)
+            ]
+        toys = ToyValues(
+            **{field: arrays[f"toys_{field}"] for field in _toy_fields},
+            channel_counts=channel_counts,
+        )
+    else:
+        toys = None
+    return StoredFit(
+        name=name,
+        metadata=metadata,
+        parameters=tuple(map(str, arrays["parameters"])),
+        values=arrays["values"],
+        errors=arrays["errors"],
+        covariance=arrays["covariance"],
+        starting_values=arrays["starting_values"],
+        internal_parameters=tuple(map(str, arrays["internal_parameters"])),
+        internal_values=arrays["internal_values"],
+        internal_errors=arrays["internal_errors"],
+        internal_covariance=arrays["internal_covariance"],
+        internal_starting_values=arrays["internal_starting_values"],
+        valid=bool(valid),
+        accurate=bool(accurate),
+        fval=float(fval),
+        nfcn=int(nfcn),
+        toys=toys,
+    )
+
+
+class ResultStore:
+    """A directory of fit results, indexed by their configuration metadata.
+
+    Example:
+        >>> store = ResultStore("results")
+        >>> store.save(fit, "poisson_2ab", luminosity=2000, channels="all")
+        >>> fits = store.load_all(luminosity=2000)
+        >>> alldecays.plotting.compare_values(fits)
+
+    The metadata of an entry is the fit configuration (fit mode, backend,
+    fit step, the fingerprints of the data set and of the FitProblem,
+    the number of toys, ...),
+    updated with the user-provided keyword arguments.
+    All metadata values must be JSON serializable.
+    Entries are written atomically, but only one process at a time
+    should add entries to a store.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._index_path = self.directory / "index.json"
+        if self._index_path.is_file():
+            with self._index_path.open() as f:
+                self._index = json.load(f)["entries"]
+        else:
+            self._index = {}
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}({str(self.directory)!r}, {len(self)} entries)"
+        )
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    @property
+    def names(self):
+        return list(self._index)
+
+    def metadata(self, name):
+        return dict(self._index[name]["metadata"])
+
+    def _write_index(self):
+        content = {"format": _store_format_version, "entries": self._index}
+        txt = json.dumps(content, indent=1).encode()
+        _write_atomic(self._index_path, lambda f: f.write(txt))
+
+    def save(self, fit, name, overwrite=False, **metadata):
+        """Store the results (and toys) of a Fit under `name`."""
+        if name in self._index and not overwrite:
+            raise KeyError(f"{name=} is already in {self}. Use `overwrite=True`.")
+        # The JSON round trip fails before anything is written, and makes the
+        # metadata of the returned object identical to the stored one.
+        metadata = json.loads(json.dumps({**_get_fit_config(fit), **metadata}))
+        stored = StoredFit.from_fit(fit, name, metadata)
+        file_name = hashlib.sha256(name.encode()).hexdigest()[:24] + ".npz"
+        arrays = _to_arrays(stored)
+        _write_atomic(self.directory / file_name, lambda f: np.savez(f, **arrays))
+        self._index[name] = {"file": file_name, "metadata": metadata}
+        self._write_index()
+        return stored
+
+    def load(self, name):
+        """The StoredFit for `name`."""
+        entry = self._index[name]
+        with np.load(self.directory / entry["file"], allow_pickle=False) as npz:
+            arrays = {k: npz[k] for k in npz.files}
+        return _from_arrays(name, dict(entry["metadata"]), arrays)
+
+    def find(self, **criteria):
+        """The names of the entries whose metadata match all `criteria`."""
+        return [
+            name
+            for name, entry in self._index.items()
+            if all(
+                k in entry["metadata"] and entry["metadata"][k] == v
+                for k, v in criteria.items()
+            )
+        ]
+
+    def load_all(self, **criteria):
+        """Dict of all StoredFit objects whose metadata match the `criteria`.
+
+        The dict can be passed directly to the fit comparison plots.
+        """
+        return {name: self.load(name) for name in self.find(**criteria)}
+
+    def remove(self, name):
+        entry = self._index.pop(name)
+        self._write_index()
+        (self.directory / entry["file"]).unlink()
@@ -0,0 +1,138 @@
+"""Publish a FitProblem to worker processes through shared memory."""
+import sys
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .fit_problem import FitProblem
+
+# Segments attached in this process. They have to stay open for as long as
+# FitProblem arrays are views on them, i.e. for the lifetime of the worker.
+_attached_segments: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _array_layout(n_boxes, n_decays):
+    """Names, shapes and offsets of the arrays in the shared buffer."""
+    shapes = {
+        "signal_matrix": (n_boxes, n_decays),
+        "bkg_vector": (n_boxes,),
+        "expected_counts": (n_boxes,),
+        "fit_start_brs": (n_decays,),
+    }
+    layout = {}
+    offset = 0
+    for name, shape in shapes.items():
+        layout[name] = (shape, offset)
+        offset += int(np.prod(shape)) * np.dtype(np.float64).itemsize
+    return layout, offset
+
+
+def _array_views(buffer, n_boxes, n_decays):
+    layout, _ = _array_layout(n_boxes, n_decays)
+    return {
+        name: np.ndarray(shape, dtype=np.float64, buffer=buffer, offset=offset)
+        for name, (shape, offset) in layout.items()
+    }
+
+
+@dataclass(frozen=True)
+class SharedFitProblemHandle:
+    """Small, picklable reference to a FitProblem in shared memory.
+
+    Send it to the worker processes and call `attach` there.
+    """
+
+    shm_name: str
+    decay_names: Tuple[str, ...]
+    channel_names: Tuple[str, ...]
+    box_names: Tuple[Tuple[str, ...], ...]
+    fingerprint: str
+    data_set_fingerprint: Optional[str] = None
+
+    def attach(self):
+        """Return the FitProblem, with read-only views on the shared arrays.
+
+        No array data is copied. The fingerprint is recomputed
+        to verify the content of the shared memory block.
+        """
+        if self.shm_name not in _attached_segments:
+            if sys.version_info >= (3, 13):
+                shm = shared_memory.SharedMemory(name=self.shm_name, track=False)
+            else:
+                # Workers started by multiprocessing share the resource
+                # tracker of the publishing process: Registering again is a no-op.
+                shm = shared_memory.SharedMemory(name=self.shm_name)
+            _attached_segments[self.shm_name] = shm
+        shm = _attached_segments[self.shm_name]
+        n_boxes = sum(len(names) for names in self.box_names)
+        arrays = _array_views(shm.buf, n_boxes, len(self.decay_names))
+        problem = FitProblem(
+            decay_names=self.decay_names,
+            channel_names=self.channel_names,
+            box_names=self.box_names,
+            data_set_fingerprint=self.data_set_fingerprint,
+            **arrays,
+        )
+        if problem.fingerprint != self.fingerprint:
+            raise ValueError(
+                f"The shared memory block {self.shm_name} does not hold "
+                f"the expected FitProblem ({self.fingerprint=})."
+            )
+        return problem
+
+
+class SharedFitProblem:
+    """Owner of a shared memory block with the arrays of a FitProblem.
+
+    The arrays are copied into shared memory once.
+    Worker processes attach to them without copying, so that the memory
+    usage does not grow with the number of workers.
+
+    Example:
+        >>> from concurrent.futures import ProcessPoolExecutor
+        >>> def run_toy(handle, seed):
+        ...     problem = handle.attach()
+        ...     rng = np.random.default_rng(seed)
+        ...     fit = Fit(problem, use_expected_counts=False, rng=rng)
+        ...     return fit.fit_mode.values
+        >>> with SharedFitProblem(FitProblem.from_data_set(data_set)) as shared:
+        ...     with ProcessPoolExecutor() as pool:
+        ...         values = list(pool.map(run_toy, [shared.handle] * 4, range(4)))
+
+    The block is released by `close` and `unlink` (or the context manager).
+    Workers must be done with the problem before it is unlinked.
+    """
+
+    def __init__(self, problem):
+        n_boxes, n_decays = problem.signal_matrix.shape
+        _, size = _array_layout(n_boxes, n_decays)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for name, view in _array_views(self._shm.buf, n_boxes, n_decays).items():
+            view[...] = getattr(problem, name)
+        del view  # Release the buffer, so that `close` is possible.
+        self.handle = SharedFitProblemHandle(
+            shm_name=self._shm.name,
+            decay_names=problem.decay_names,
+            channel_names=problem.channel_names,
+            box_names=problem.box_names,
+            fingerprint=problem.fingerprint,
+            data_set_fingerprint=problem.data_set_fingerprint,
+        )
+
+    def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        self.unlink()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.handle.shm_name})"
@@ -1,4 +1,5 @@
 """The toy values class."""
+import numpy as np
 
 
 class ToyValues:
@@ -34,6 +35,25 @@ class ToyValues:
         if self._channel_counts is not None:
             assert n_toys == len(self._channel_counts)
 
+    def __getstate__(self):
+        # Stack the per-toy channel counts into one array per channel.
+        state = self.__dict__.copy()
+        if self._channel_counts:
+            state["_channel_counts"] = {
+                name: np.array([cc[name] for cc in self._channel_counts])
+                for name in self._channel_counts[0]
+            }
+        return state
+
+    def __setstate__(self, state):
+        channel_counts = state["_channel_counts"]
+        if isinstance(channel_counts, dict):
+            state["_channel_counts"] = [
+                {name: counts[i] for name, counts in channel_counts.items()}
+                for i in range(len(state["physics"]))
+            ]
+        self.__dict__.update(state)
+
     def __len__(self):
         return self.physics.shape[0]
 
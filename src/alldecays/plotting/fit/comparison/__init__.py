@@ -24,7 +24,8 @@ def compare_values(
     by wrapping them as `FitParameter` objects.
 
     Args:
-        fit: An alldecays.Fit or alldecays.plotting.util.FitParameters object.
+        fit: An alldecays.Fit, alldecays.fitting.StoredFit
+            or alldecays.plotting.util.FitParameters object.
         param_space: One of `internal` or `physics`.
         use_toys: If True, use values, errors and correlations
             obtained in the toy study (`fit.fill_toys`)
@@ -104,7 +105,8 @@ def compare_values_only(
     by wrapping them as `FitParameter` objects.
 
     Args:
-        fit: An alldecays.Fit or alldecays.plotting.util.FitParameters object.
+        fit: An alldecays.Fit, alldecays.fitting.StoredFit
+            or alldecays.plotting.util.FitParameters object.
         ax: matplotlib axis that the plot is drawn onto.
             By default, create a new axis object.
         param_space: One of `internal` or `physics`.
@@ -176,7 +178,8 @@ def compare_errors_only(
     by wrapping them as `FitParameter` objects.
 
     Args:
-        fit: An alldecays.Fit or alldecays.plotting.util.FitParameters object.
+        fit: An alldecays.Fit, alldecays.fitting.StoredFit
+            or alldecays.plotting.util.FitParameters object.
         ax: matplotlib axis that the plot is drawn onto.
             By default, create a new axis object.
         param_space: One of `internal` or `physics`.
@@ -21,7 +21,8 @@ def fit_correlations(
     """Correlations between the fit parameters.
 
     Args:
-        fit: An alldecays.Fit or alldecays.plotting.util.FitParameters object.
+        fit: An alldecays.Fit, alldecays.fitting.StoredFit
+            or alldecays.plotting.util.FitParameters object.
         ax: matplotlib axis that the plot is drawn onto.
             By default, create a new axis object.
         param_space: One of `internal` or `physics`.
@@ -4,6 +4,8 @@ from typing import List
 
 import numpy as np
 
+from alldecays.fitting.result_store import StoredFit
+
 
 @dataclass
 class FitParameters:
@@ -79,12 +81,46 @@ def _get_fit_parameters_from_toys(fit, param_space):
     return fp
 
 
+def _get_fit_parameters_from_stored_fit(stored, param_space, use_toys):
+    """Helper for get_fit_parameters"""
+    if param_space == "internal":
+        names = stored.internal_parameters
+        starting_values = stored.internal_starting_values
+        toy_values = None if stored.toys is None else stored.toys.internal
+        values, errors = stored.internal_values, stored.internal_errors
+        covariance = stored.internal_covariance
+    elif param_space == "physics":
+        names = stored.parameters
+        starting_values = stored.starting_values
+        toy_values = None if stored.toys is None else stored.toys.physics
+        values, errors = stored.values, stored.errors
+        covariance = stored.covariance
+    else:
+        raise NotImplementedError(f"`param_space` must be one of {valid_param_spaces}.")
+    if use_toys:
+        if toy_values is None:
+            raise AttributeError(f"{stored} has no toys.")
+        covariance = np.cov(toy_values.T)
+        values = toy_values.mean(axis=0)
+        errors = covariance.diagonal() ** 0.5
+    return FitParameters(
+        names=names,
+        values=values,
+        errors=errors,
+        covariance=covariance,
+        starting_values=starting_values,
+        param_space=param_space,
+        is_from_toys=use_toys,
+    )
+
+
 def get_fit_parameters(fit, param_space, use_toys=False):
     """Return a data class that contains the data needed for fit plots.
 
     Args:
-        fit: An alldecays.Fit object. If instead it is a FitParameter already ,
-            it will be simply passed through his function.
+        fit: An alldecays.Fit object, or a `StoredFit` loaded from a
+            `alldecays.fitting.ResultStore`. If instead it is a FitParameter
+            already, it will be simply passed through his function.
         param_space: One of `internal` or `physics`.
         use_toys: If True, use values, errors and correlations
             obtained in the toy study (`fit.fill_toys`)
@@ -94,7 +130,9 @@ def get_fit_parameters(fit, param_space, use_toys=False):
     if isinstance(fit, FitParameters):
         return fit
 
-    if use_toys:
+    if isinstance(fit, StoredFit):
+        fp = _get_fit_parameters_from_stored_fit(fit, param_space, use_toys)
+    elif use_toys:
         fp = _get_fit_parameters_from_toys(fit, param_space)
     else:
         fp = _get_fit_parameters_from_fit(fit, param_space)
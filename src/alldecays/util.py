@@ -0,0 +1,24 @@
+"""Helpers shared by the data handling and the fitting code."""
+import os
+import threading
+
+import numpy as np
+
+
+def _read_only(array):
+    """A contiguous float64 version of the array that cannot be modified."""
+    array = np.ascontiguousarray(array, dtype=np.float64)
+    array.setflags(write=False)
+    return array
+
+
+def _write_atomic(path, write):
+    """Call `write(f)` on a temporary file, then move it to `path`.
+
+    The file is moved into place only after it was fully written,
+    so that parallel processes or threads never read a partial file.
+    """
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with tmp_path.open("wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
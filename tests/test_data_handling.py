@@ -1,8 +1,18 @@
+import itertools
+import pickle
+import shutil
+
 import numpy as np
+import pandas as pd
 import pytest
-from conftest import channel1_path, channel_polarized_path, decay_names
+from conftest import channel1_path, channel2_path, channel_polarized_path, decay_names
 
 import alldecays
+from alldecays.data_handling import channel_cache, data_channel, pure_data_channel
+from alldecays.data_handling.data_channel import _DataChannel
+from alldecays.data_handling.event_tables import write_count_tables
+from alldecays.data_handling.pure_data_channel import _draw_test_counts
+from alldecays.exceptions import DataChannelError, DataSetError
 
 
 @pytest.mark.parametrize("data_type", ["polarized", "unpolarized"])
@@ -49,6 +59,57 @@ def test_expected_counts(channel_polarized):
     assert box_changed_br == pytest.approx(changed_should_be, abs=1e-1)
 
 
+def test_batched_hypotheses(channel_polarized):
+    channel = channel_polarized
+    rng = np.random.default_rng(1)
+    data_brs = rng.dirichlet(np.ones(len(decay_names)), size=5)
+    expected = channel.get_expected_counts_batch(data_brs)
+    assert expected.shape == (5, len(channel.box_names))
+    for brs, batch_counts in zip(data_brs, expected):
+        single_counts = channel._get_expected_counts_array(brs / brs.sum())
+        assert batch_counts == pytest.approx(single_counts, rel=1e-12)
+
+    toys = channel.get_toys_batch(data_brs, size=3, rng=rng)
+    assert toys.shape == (5, 3, len(channel.box_names))
+    assert (toys.sum(axis=-1).T == expected.sum(axis=1).astype(int)).all()
+    assert channel.get_toys_batch(data_brs, rng=rng).shape == expected.shape
+
+    with pytest.raises(DataChannelError, match="indices \\[1\\]"):
+        channel.get_expected_counts_batch([[1, 0, 0], [0.5, 0.6, -0.1]])
+    with pytest.raises(DataChannelError):
+        channel.get_expected_counts_batch([1, 0, 0])
+
+
+@pytest.mark.parametrize("data_type", ["polarized", "unpolarized"])
+def test_drop_bkg(data_type):
+    channel_path, polarization = {
+        "unpolarized": (channel1_path, None),
+        "polarized": (channel_polarized_path, (-0.8, 0.3)),
+    }[data_type]
+    channel = _DataChannel(channel_path, decay_names, polarization)
+    old_mc_matrix = channel.mc_matrix
+    dropped, *kept = channel.bkg_names
+    channel.drop_bkg(dropped)
+    assert channel.bkg_names == kept
+    assert len(channel.bkg_cs_default) == len(kept)
+    assert channel.mc_matrix.equals(old_mc_matrix.drop(columns=dropped))
+    assert channel._mc_array.flags.c_contiguous
+    assert (
+        channel._get_expected_counts_array() == channel.get_expected_counts().values
+    ).all()
+
+
+def test_pickled_channel_versions(monkeypatch):
+    channel = _DataChannel(channel1_path, decay_names)
+    expected = channel.get_expected_counts().values
+    pickled = pickle.dumps(channel)
+    # Another process can reach the pickled version with its own counter.
+    monkeypatch.setattr(data_channel, "_versions", itertools.count(channel.version))
+    loaded = pickle.loads(pickled)
+    loaded.luminosity_ifb = 2 * channel.luminosity_ifb
+    assert loaded.get_expected_counts().values == pytest.approx(2 * expected)
+
+
 def test_toys(channel_polarized):
     rng = np.random.default_rng(1)
     one_toy = channel_polarized.get_toys(rng=rng)
@@ -61,6 +122,247 @@ def test_toys(channel_polarized):
     assert (toy_sum_expected == toy_sum_obtained).all()
 
 
+def test_monte_carlo_split():
+    counts = np.array([[3209, 1137, 1196, 547], [0, 5, 0, 1], [0, 0, 0, 0]])
+    huge_counts = np.array([[3 * 10**9, 10**9, 5], [4, 2, 0]])
+    for c in [counts, huge_counts]:
+        test_counts = _draw_test_counts(c, 0.5, np.random.default_rng(1))
+        assert (test_counts >= 0).all() and (test_counts <= c).all()
+        assert (test_counts.sum(axis=1) == c.sum(axis=1) // 2).all()
+        same_seed = _draw_test_counts(c, 0.5, np.random.default_rng(1))
+        assert (test_counts == same_seed).all()
+    # The same split as with one multivariate hypergeometric draw per process.
+    rng = np.random.default_rng(1)
+    per_row = [rng.multivariate_hypergeometric(row, row.sum() // 2) for row in counts]
+    test_counts = _draw_test_counts(counts, 0.5, np.random.default_rng(1))
+    assert (test_counts == np.array(per_row)).all()
+
+
+@pytest.mark.parametrize("ignore_bias", [False, True])
+@pytest.mark.parametrize("data_type", ["polarized", "unpolarized"])
+def test_channel_cache(tmp_path, data_type, ignore_bias):
+    channel_path, polarization, n_files = {
+        "unpolarized": (channel1_path, None, 1),
+        "polarized": (channel_polarized_path, (-0.8, 0.3), 4),
+    }[data_type]
+    kwargs = dict(
+        polarization=polarization, ignore_limited_mc_statistics_bias=ignore_bias
+    )
+    reference = alldecays.DataSet(decay_names, **kwargs)
+    reference.add_channel("channel", channel_path)
+    ref_channel = reference.get_channels()["channel"]
+    for _ in range(2):  # Fill the cache, then read from it.
+        ds = alldecays.DataSet(decay_names, cache_dir=tmp_path, **kwargs)
+        ds.add_channel("channel", channel_path)
+        channel = ds.get_channels()["channel"]
+        assert channel.mc_matrix.equals(ref_channel.mc_matrix)
+        assert channel._data_faker.equals(ref_channel._data_faker)
+        assert (channel.bkg_cs_default == ref_channel.bkg_cs_default).all()
+        assert channel.signal_cs_default == ref_channel.signal_cs_default
+        assert len(list(tmp_path.glob("*.npz"))) == n_files
+
+
+def test_source_files_hashed_only_for_cache(tmp_path, monkeypatch):
+    hashed = []
+
+    def counting_file_hash(path):
+        hashed.append(path)
+        return file_hash(path)
+
+    file_hash = channel_cache.file_hash
+    monkeypatch.setattr(channel_cache, "file_hash", counting_file_hash)
+    path = tmp_path / "channel.csv"
+    shutil.copy(channel1_path, path)
+    channel = _DataChannel(path, decay_names)
+    assert channel.fingerprint
+    assert not hashed
+    _DataChannel(path, decay_names, cache_dir=tmp_path / "cache")
+    assert len(hashed) == 1
+
+
+def test_shared_pure_channels(tmp_path):
+    ds1 = alldecays.DataSet(decay_names, polarization=(-0.8, 0.3))
+    ds2 = alldecays.DataSet(decay_names, polarization=(0.8, -0.3))
+    ds1.add_channel("my_channel", channel_polarized_path)
+    ds2.add_channel("my_channel", channel_polarized_path)
+    pcs1 = ds1.get_channels()["my_channel"]._pure_channels
+    pcs2 = ds2.get_channels()["my_channel"]._pure_channels
+    for pol, pc in pcs1.items():
+        assert pc is not pcs2[pol]
+        assert pc._mc_array is pcs2[pol]._mc_array
+        assert not pc._mc_array.flags.writeable
+
+    bkg_name = ds1.get_channels()["my_channel"].bkg_names[0]
+    ds2.get_channels()["my_channel"].drop_bkg([bkg_name])
+    assert bkg_name in ds1.get_channels()["my_channel"].bkg_names
+
+    path = tmp_path / "channel.csv"
+    shutil.copy(channel1_path, path)
+    channel = _DataChannel(path, decay_names)
+    df = pd.read_csv(path, index_col=0)
+    df.iloc[0, -1] += 1000
+    df.to_csv(path)
+    changed_channel = _DataChannel(path, decay_names)
+    assert changed_channel.fingerprint != channel.fingerprint
+    key = pure_data_channel._get_registry_key(
+        path,
+        decay_names,
+        ignore_limited_mc_statistics_bias=False,
+        allow_zero_signal=False,
+    )
+    assert key in pure_data_channel._loaded_pure_channels
+    del changed_channel
+    assert key not in pure_data_channel._loaded_pure_channels
+
+
+def test_fractional_counts(tmp_path):
+    # Channel files with non-integer counts load as before (truncated split).
+    df = pd.read_csv(channel1_path, index_col=0)
+    df.iloc[:, 1:] *= 1.25
+    df.to_csv(tmp_path / "scaled.csv")
+    channel = _DataChannel(tmp_path / "scaled.csv", decay_names)
+    assert np.isfinite(channel.get_expected_counts().values).all()
+
+
+def test_train_test_files(tmp_path, monkeypatch):
+    df = pd.read_csv(channel1_path, index_col=0)
+    train_df = df.drop(index="bkg2")
+    train_df.to_csv(tmp_path / "train_channel.csv")
+    test_df = df.copy()
+    test_df.iloc[:, 1:] = df.iloc[:, 1:] // 2
+    test_df.to_csv(tmp_path / "test_channel.csv")
+
+    read_paths = []
+
+    def counting_read_table(csv_path):
+        read_paths.append(csv_path)
+        return read_table(csv_path)
+
+    read_table = pure_data_channel._read_table
+    monkeypatch.setattr(pure_data_channel, "_read_table", counting_read_table)
+    channel = _DataChannel(tmp_path / "train_channel.csv", decay_names)
+    assert sorted(p.name for p in read_paths) == sorted(
+        ["train_channel.csv", "test_channel.csv"]
+    )
+    # bkg2 is missing from the train file: Its selected counts are set to 0.
+    assert (channel.mc_matrix["bkg2"] == 0).all()
+    assert channel._data_faker["bkg2"].notna().all()
+    assert channel.bkg_cs_default[channel.bkg_names.index("bkg2")] == pytest.approx(
+        df.loc["bkg2", "cross section [fb]"]
+    )
+    box_names = list(channel.box_names)
+    expected = (test_df[box_names].T / test_df.iloc[:, 1:].sum(axis=1))["bkg1"]
+    assert np.allclose(channel._data_faker["bkg1"], expected)
+
+
+def _table_to_events(df, polarization=None):
+    """One event per MC count of the channel table."""
+    columns = [c for c in df.columns if c != pure_data_channel.cross_section_column]
+    counts = df[columns].values.astype(np.int64)
+    n_events = counts.sum()
+    events = np.zeros(
+        n_events, dtype=[("process", "U8"), ("box", "i8"), ("polarization", "U4")]
+    )
+    events["process"] = np.repeat(np.repeat(df.index, len(columns)), counts.ravel())
+    # Column 0 is `unselected`, which is box -1.
+    box_codes = np.arange(len(columns)) - 1
+    events["box"] = np.repeat(np.tile(box_codes, len(df)), counts.ravel())
+    events["polarization"] = polarization or ""
+    return events
+
+
+def test_channel_from_events(tmp_path):
+    box_names = ["box1", "box2", "box3", "box4"]
+    events, cross_sections = [], {}
+    for pol_path in sorted(channel_polarized_path.glob("*.csv")):
+        df = pd.read_csv(pol_path, index_col=0)
+        events.append(_table_to_events(df, pol_path.stem))
+        cross_sections[pol_path.stem] = df[pure_data_channel.cross_section_column]
+    events = np.random.default_rng(1).permutation(np.concatenate(events))
+    np.save(tmp_path / "events.npy", events)
+
+    reference = alldecays.DataSet(decay_names, polarization=(-0.8, 0.3))
+    reference.add_channel("my_channel", channel_polarized_path)
+    ds = alldecays.DataSet(decay_names, polarization=(-0.8, 0.3))
+    channel_path = ds.add_channel_from_events(
+        "my_channel",
+        tmp_path / "events.npy",
+        tmp_path / "tables",
+        box_names,
+        cross_sections,
+        chunk_size=1000,
+    )
+    assert channel_path == tmp_path / "tables" / "my_channel"
+    ref_channel = reference.get_channels()["my_channel"]
+    channel = ds.get_channels()["my_channel"]
+    assert channel.mc_matrix.equals(ref_channel.mc_matrix)
+    assert channel._data_faker.equals(ref_channel._data_faker)
+    unpolarized = alldecays.DataSet(decay_names)
+    with pytest.raises(DataSetError):
+        unpolarized.add_channel_from_events(
+            "my_channel", events, tmp_path, box_names, cross_sections
+        )
+
+    df = pd.read_csv(channel1_path, index_col=0)
+    events = _table_to_events(df)
+    events = {"process": events["process"], "box": events["box"]}
+    events["weight"] = np.full(len(events["box"]), 0.5)
+    cross_sections = df[pure_data_channel.cross_section_column]
+    channel_path = unpolarized.add_channel_from_events(
+        "weighted", events, tmp_path, box_names, cross_sections, test_fraction=0.3
+    )
+    assert channel_path == tmp_path / "train_weighted.npz"
+    test_table = pure_data_channel._read_table(tmp_path / "test_weighted.npz")
+    assert test_table[box_names].values.sum() == pytest.approx(
+        0.5 * 0.3 * df[box_names].values.sum(), rel=0.02
+    )
+    assert "weighted" in unpolarized.get_channels()
+    # Weighted counts cannot be split into train and test samples.
+    with pytest.raises(DataSetError):
+        unpolarized.add_channel_from_events(
+            "no_split", events, tmp_path, box_names, cross_sections
+        )
+    with pytest.raises(DataSetError):
+        write_count_tables(tmp_path, "no_split", events, box_names, cross_sections)
+    assert not (tmp_path / "no_split.npz").exists()
+    no_bias = alldecays.DataSet(decay_names, ignore_limited_mc_statistics_bias=True)
+    no_bias.add_channel_from_events(
+        "no_split", events, tmp_path, box_names, cross_sections
+    )
+    events["box"][0] = 4
+    with pytest.raises(DataChannelError):
+        unpolarized.add_channel_from_events(
+            "invalid", events, tmp_path, box_names, cross_sections, test_fraction=0.3
+        )
+
+
+@pytest.mark.parametrize("suffix", [".npz", ".parquet", ".feather"])
+def test_columnar_formats(tmp_path, suffix):
+    if suffix != ".npz":
+        pytest.importorskip("pyarrow")
+    for csv_path in channel_polarized_path.glob("*.csv"):
+        df = pd.read_csv(csv_path, index_col=0)
+        path = tmp_path / (csv_path.stem + suffix)
+        if suffix == ".npz":
+            np.savez(
+                path,
+                processes=np.array(df.index, dtype=str),
+                columns=np.array(df.columns, dtype=str),
+                values=df.to_numpy(np.float64),
+            )
+        elif suffix == ".parquet":
+            df.to_parquet(path)
+        else:  # Feather files have no index: processes in the first column.
+            df.reset_index().to_feather(path)
+
+    polarization = (-0.8, 0.3)
+    reference = _DataChannel(channel_polarized_path, decay_names, polarization)
+    channel = _DataChannel(tmp_path, decay_names, polarization)
+    assert channel.mc_matrix.equals(reference.mc_matrix)
+    assert channel._data_faker.equals(reference._data_faker)
+    assert (channel.bkg_cs_default == reference.bkg_cs_default).all()
+
+
 @pytest.mark.parametrize("data_type", ["polarized", "unpolarized"])
 def test_data_set_add_channel(data_type):
     channel_paths = {
@@ -79,12 +381,76 @@ def test_data_set_add_channel(data_type):
     )
 
 
+def test_data_set_add_channels_errors(tmp_path):
+    ds = alldecays.DataSet(decay_names)
+    channel_paths = {
+        "good": channel1_path,
+        "missing1": tmp_path / "missing1.csv",
+        "good2": channel2_path,
+        "missing2": tmp_path / "missing2.csv",
+    }
+    for _ in range(3):  # Independent of the thread timing.
+        with pytest.raises(FileNotFoundError, match="missing1"):
+            ds.add_channels(channel_paths, n_workers=4)
+        assert list(ds.get_channels()) == ["good"]
+        ds.drop_channels(["good"])
+    with pytest.raises(DataSetError):
+        ds.add_channels({"channel1": channel2_path, channel1_path: None})
+    assert len(ds.get_channels()) == 0
+
+
+def test_lazy_data_set(tmp_path):
+    polarization = (-0.8, 0.3)
+    ds = alldecays.DataSet(decay_names, polarization=(0.8, -0.3), lazy=True)
+    ds.add_channel("channel", channel_polarized_path)
+    ds.add_channels({"never_loaded": tmp_path / "missing"})
+    assert ds.channel_names == ["channel", "never_loaded"]
+    assert "never_loaded" in repr(ds)
+    ds.drop_channels(["never_loaded"])
+    ds.polarization = polarization
+    ds.luminosity_ifb = 2_000
+    ds.data_brs = np.array([0.2, 0.3, 0.5])
+    assert len(ds._channels) == 0
+
+    eager = alldecays.DataSet(
+        decay_names,
+        polarization=polarization,
+        luminosity_ifb=2_000,
+        data_brs=np.array([0.2, 0.3, 0.5]),
+    )
+    eager.add_channel("channel", channel_polarized_path)
+    expected = eager.get_channels()["channel"].get_expected_counts()
+    assert list(ds.get_channels()) == ["channel"]
+    assert ds.get_channels()["channel"].get_expected_counts().equals(expected)
+
+    combined = alldecays.CombinedDataSet(
+        decay_names,
+        {"lazy": ds},
+        data_brs=ds.data_brs,
+        fit_start_brs=ds.fit_start_brs,
+    )
+    ds.add_channel("pending", channel_polarized_path)
+    assert combined.channel_names == ["lazy:channel", "lazy:pending"]
+    assert "pending" in ds._pending_channels
+
+    # The files of pending channels have the decay names from registration.
+    renamed = ds.clone(decay_names=["new" + n for n in decay_names])
+    assert renamed.get_channels()["pending"].decay_names == renamed.decay_names
+    assert "pending" in ds._pending_channels
+    lazy = alldecays.DataSet(decay_names, polarization=polarization, lazy=True)
+    lazy.add_channel("my_channel", channel_polarized_path)
+    go_through_setters(lazy, lambda: lazy.get_channels()["my_channel"])
+
+
 def go_through_setters(ds, channel, is_combination=False):
+    """`channel` can also be a function that returns it (for lazy data sets)."""
+    get_channel = channel if callable(channel) else lambda: channel
     old_decay_names = ds.decay_names
     new_decay_names = ["new" + n for n in decay_names]
     ds.decay_names = new_decay_names
-    assert channel.decay_names == new_decay_names
+    assert get_channel().decay_names == new_decay_names
     ds.decay_names = old_decay_names
+    channel = get_channel()
 
     old_data_brs = ds.data_brs
     changed_brs = np.zeros_like(ds.data_brs)
@@ -136,6 +502,154 @@ def test_data_set_combined():
     go_through_setters(combined, channel, is_combination=True)
 
 
+def test_combined_channel_index():
+    ds1 = alldecays.DataSet(decay_names, polarization=(-0.8, 0.3))
+    ds2 = alldecays.DataSet(decay_names, polarization=(0.8, -0.3))
+    ds1.add_channel("my_channel", channel_polarized_path)
+    ds2.add_channel("my_channel", channel_polarized_path)
+    stage = alldecays.CombinedDataSet(decay_names, {"L": ds1, "R": ds2})
+    combined = alldecays.CombinedDataSet(decay_names, {"250": stage})
+    channels = combined.get_channels()
+    assert combined.get_channels() is channels
+    assert list(channels) == ["250:L:my_channel", "250:R:my_channel"]
+    assert combined.channel_names == list(channels)
+    assert channels["250:L:my_channel"] is ds1.get_channels()["my_channel"]
+
+    ds2.add_channel("one_more_channel", channel_polarized_path)
+    assert "250:R:one_more_channel" in combined.get_channels()
+    ds2.drop_channels(["my_channel"])
+    assert "250:R:my_channel" not in combined.get_channels()
+    stage.add_data_sets({"L_copy": ds1})
+    assert "250:L_copy:my_channel" in combined.get_channels()
+    assert combined.clone().get_channels()["250:L:my_channel"] is not (
+        channels["250:L:my_channel"]
+    )
+
+    combined.add_data_sets({"500": stage.clone()})
+    assert len(combined.get_channels()) == 6
+    assert combined.channel_names == list(combined.get_channels())
+
+
+def test_fingerprint(tmp_path):
+    def new_data_set(channel_path=channel_polarized_path):
+        ds = alldecays.DataSet(decay_names, polarization=(-0.8, 0.3))
+        ds.add_channel("my_channel", channel_path)
+        return ds
+
+    ds = new_data_set()
+    channel = ds.get_channels()["my_channel"]
+    fingerprint = ds.fingerprint
+    assert new_data_set().fingerprint == fingerprint
+
+    channel_fingerprints = {channel.fingerprint}
+    for attribute, value in [
+        ("luminosity_ifb", 2000),
+        ("signal_scaler", 1.2),
+        ("polarization", (0.8, -0.3)),
+        ("data_brs", np.array([0.5, 0.3, 0.2])),
+    ]:
+        setattr(ds, attribute, value)
+        channel_fingerprints.add(channel.fingerprint)
+    assert len(channel_fingerprints) == 5
+    ds.fit_start_brs = np.array([0.2, 0.3, 0.5])
+    fingerprints = {fingerprint, ds.fingerprint}
+    channel.drop_bkg(channel.bkg_names[0])
+    fingerprints.add(ds.fingerprint)
+    channel.box_names = [f"new_{name}" for name in channel.box_names]
+    fingerprints.add(ds.fingerprint)
+    assert len(fingerprints) == 4
+
+    # The file content is part of the fingerprint, not the path.
+    channel_dir = tmp_path / "copy"
+    shutil.copytree(channel_polarized_path, channel_dir)
+    assert new_data_set(channel_dir).fingerprint == fingerprint
+    csv_path = next(channel_dir.glob("eLpL.csv"))
+    csv_path.write_text(csv_path.read_text().replace(",1", ",2", 1))
+    assert new_data_set(channel_dir).fingerprint != fingerprint
+
+    combined = alldecays.CombinedDataSet(decay_names, {"ds": new_data_set()})
+    combined_fingerprint = combined.fingerprint
+    combined.add_data_sets({"ds_copy": new_data_set()})
+    assert combined.fingerprint != combined_fingerprint
+
+
+def test_channel_versions():
+    ds = alldecays.DataSet(decay_names, polarization=(-0.8, 0.3))
+    ds.add_channels({"a": channel_polarized_path, "b": channel_polarized_path})
+    channel = ds.get_channels()["a"]
+    expected_counts = channel._get_expected_counts_array()
+    fit_blocks = channel._get_fit_blocks()
+    versions = ds.channel_versions
+
+    # Setting the current values is not a change.
+    ds.polarization = tuple(ds.polarization)
+    ds.data_brs = np.array(ds.data_brs)
+    ds.luminosity_ifb = ds.luminosity_ifb
+    assert ds.channel_versions == versions
+    assert channel._get_expected_counts_array() is expected_counts
+    assert channel._get_fit_blocks() is fit_blocks
+    with pytest.raises(ValueError):
+        channel.data_brs[0] = 1
+
+    channel.signal_scaler = 2.0
+    new_versions = ds.channel_versions
+    assert new_versions["a"] != versions["a"]
+    assert new_versions["b"] == versions["b"]
+    assert channel._get_fit_blocks() is not fit_blocks
+    assert np.allclose(channel._get_fit_blocks()[0], 2 * fit_blocks[0])
+    new_expected_counts = channel.get_expected_counts().values
+    reference = _DataChannel(
+        channel_polarized_path,
+        decay_names,
+        polarization=(-0.8, 0.3),
+        data_brs=ds.data_brs,
+        signal_scaler=2.0,
+    )
+    assert np.allclose(new_expected_counts, reference.get_expected_counts().values)
+
+    ds.polarization = (0.8, -0.3)
+    assert all(ds.channel_versions[k] != new_versions[k] for k in ["a", "b"])
+
+
+def test_data_set_clone():
+    ds = alldecays.DataSet(decay_names, polarization=(-0.8, 0.3))
+    ds.add_channel("my_channel", channel_polarized_path)
+    channel = ds.get_channels()["my_channel"]
+    fingerprint = ds.fingerprint
+
+    clone = ds.clone()
+    assert clone.fingerprint == fingerprint
+    cloned_channel = clone.get_channels()["my_channel"]
+    assert cloned_channel is not channel
+    for pol, pc in channel._pure_channels.items():
+        assert cloned_channel._pure_channels[pol]._mc_array is pc._mc_array
+
+    bkg_name = channel.bkg_names[0]
+    clone = ds.clone(signal_scaler=2.0, luminosity_ifb=500, drop_bkg=[bkg_name])
+    cloned_channel = clone.get_channels()["my_channel"]
+    assert cloned_channel.signal_scaler == 2.0
+    assert cloned_channel.luminosity_ifb == 500
+    assert bkg_name not in cloned_channel.bkg_names
+    assert bkg_name in channel.bkg_names
+    assert ds.fingerprint == fingerprint
+
+    reloaded = alldecays.DataSet(
+        decay_names, polarization=(0.8, -0.3), signal_scaler=2.0
+    )
+    reloaded.add_channel("my_channel", channel_polarized_path)
+    clone = ds.clone(polarization=(0.8, -0.3), signal_scaler=2.0)
+    assert clone.fingerprint == reloaded.fingerprint
+    assert ds.fingerprint == fingerprint
+    with pytest.raises(TypeError):
+        ds.clone(cache_dir="somewhere")
+
+    combined = alldecays.CombinedDataSet(decay_names, {"a": ds, "b": ds})
+    combined_clone = combined.clone(signal_scaler=0.5)
+    assert combined_clone._data_sets["a"] is combined_clone._data_sets["b"]
+    assert combined_clone._data_sets["a"].signal_scaler == 0.5
+    assert ds.signal_scaler == 1.0
+
+
 def test_data_set_subclassing():
     from alldecays.data_handling.abstract_data_set import AbstractDataSet
 
@@ -1,8 +1,28 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pytest
+from conftest import channel1_path, channel2_path, decay_names
 
 import alldecays
+from alldecays.exceptions import FitException
+from alldecays.fitting import (
+    FitCache,
+    FitProblem,
+    ResultStore,
+    SharedFitProblem,
+    StoredFit,
+)
+from alldecays.fitting.backends import (
+    available_backends,
+    compare_backends,
+    minimizer_state,
+)
+from alldecays.fitting.fit import available_fit_steps
 from alldecays.fitting.plugins import available_fit_modes, get_fit_mode
 from alldecays.fitting.plugins.abstract_fit_plugin import AbstractFitPlugin
+from alldecays.plotting.util import get_fit_parameters
 
 
 def test_fit_mode_choice(data_set1):
@@ -65,6 +85,13 @@ def test_fit_step_valid(fit_step, data_set1):
     alldecays.Fit(data_set1, fit_step=fit_step)
 
 
+def test_fit_step_presets(data_set1):
+    for name in available_fit_steps:
+        alldecays.Fit(data_set1, fit_step=name)
+    with pytest.raises(NotImplementedError):
+        alldecays.Fit(data_set1, fit_step="Non-existing name")
+
+
 def test_fit_step_invalid(data_set1):
     def fit_step(x):
         x.migrad(2)
@@ -72,3 +99,288 @@ def test_fit_step_invalid(data_set1):
     with pytest.raises(alldecays.exceptions.InvalidFitException):
         alldecays.Fit(data_set1, fit_step=fit_step)
     alldecays.Fit(data_set1, fit_step=fit_step, raise_invalid_fit_exception=False)
+
+
+@pytest.mark.parametrize("backend", available_backends.keys())
+@pytest.mark.parametrize("fit_mode_name", available_fit_modes.keys())
+def test_backends(backend, fit_mode_name, data_set1):
+    # The other backends use the exact covariance. That of MIGRAD is approximate.
+    reference = alldecays.Fit(
+        data_set1, fit_mode=fit_mode_name, analytic_covariance=backend != "Minuit"
+    )
+    try:
+        fit = alldecays.Fit(data_set1, fit_mode=fit_mode_name, backend=backend)
+    except FitException:
+        cost_function_lacks_structure = {"lsq_linear": ["Poisson"]}
+        assert fit_mode_name in cost_function_lacks_structure[backend]
+        return
+    m = fit.fit_mode
+    assert fit.Minuit.valid and fit.Minuit.accurate
+    assert fit.Minuit.nfcn > 0
+    assert fit.Minuit.fval == pytest.approx(reference.Minuit.fval, abs=1e-3)
+    assert (abs(m.values - reference.fit_mode.values) < 1e-2 * m.errors).all()
+    assert m.errors == pytest.approx(reference.fit_mode.errors, rel=1e-2)
+    assert len(fit.Minuit.parameters) == len(fit.Minuit.values)
+    toys = fit.fill_toys(n_toys=2)
+    assert toys.valid.all()
+
+
+def test_compare_backends(data_set1):
+    comparison = compare_backends(data_set1, n_repeat=1)
+    assert list(comparison.index) == list(available_backends)
+    assert comparison["valid"].all()
+
+
+def test_newton_poisson(data_set1):
+    fit = alldecays.Fit(data_set1, fit_mode="Poisson", backend="Newton")
+    assert fit.Minuit.nfcn < 10
+    m = fit.fit_mode
+    fcn = m._create_likelihood()
+    assert abs(fcn.grad(m.values)).max() < 1e-3
+    exact_covariance = np.linalg.inv(fcn.hessian(m.values))
+    assert m.covariance == pytest.approx(exact_covariance)
+    toys = fit.fill_toys(n_toys=5)
+    assert toys.valid.all() and toys.accurate.all()
+
+
+@pytest.mark.parametrize("fit_mode_name", available_fit_modes.keys())
+def test_analytic_covariance(fit_mode_name, data_set1):
+    hesse_fit = alldecays.Fit(data_set1, fit_mode=fit_mode_name)
+    fit = alldecays.Fit(data_set1, fit_mode=fit_mode_name, analytic_covariance=True)
+    assert fit._fit_step.__name__ == "analytic_covariance_fit_step"
+    assert fit.fit_mode.accurate
+    covariance = fit.fit_mode.covariance
+    # HESSE is a numerical approximation. For Poisson it is off by a few %.
+    assert covariance == pytest.approx(hesse_fit.fit_mode.covariance, rel=5e-2)
+    fcn = fit.fit_mode._fcn
+    exact_covariance = np.linalg.inv(fcn.hessian(fit.fit_mode.values))
+    assert covariance == pytest.approx(exact_covariance)
+    refit = alldecays.Fit(data_set1, fit_mode=fit_mode_name, analytic_covariance=True)
+    assert (refit.fit_mode.covariance == covariance).all()
+    toys = fit.fill_toys(n_toys=3)
+    assert toys.valid.all() and toys.accurate.all()
+
+
+@pytest.mark.parametrize("backend", [None, "Newton"])
+def test_pickle_fit(data_set1, backend):
+    fit = alldecays.Fit(
+        data_set1,
+        fit_mode="Poisson",
+        use_expected_counts=False,
+        rng=np.random.default_rng(4),
+        print_brs_sum_not_1=False,
+        backend=backend,
+    )
+    fit.fill_toys(n_toys=3, store_channel_counts=True)
+    loaded = pickle.loads(pickle.dumps(fit))
+    # The data set is replaced by the (much smaller) FitProblem.
+    assert b"alldecays.data_handling" not in pickle.dumps(fit)
+    assert loaded._data_set is loaded.fit_mode._fit_problem
+
+    assert type(loaded.Minuit) is type(fit.Minuit)
+    assert (loaded.fit_mode.values == fit.fit_mode.values).all()
+    assert np.allclose(loaded.fit_mode.covariance, fit.fit_mode.covariance)
+    assert loaded.Minuit.valid == fit.Minuit.valid
+    assert loaded.Minuit.nfcn == fit.Minuit.nfcn
+    # The toy counts are kept and the likelihood is rebuilt from them.
+    x = np.array(fit.Minuit.values)
+    assert loaded.fit_mode._fcn(x) == fit.fit_mode._fcn(x)
+    assert (loaded.toys.physics == fit.toys.physics).all()
+    for counts, loaded_counts in zip(
+        fit.toys._channel_counts, loaded.toys._channel_counts
+    ):
+        assert (counts["no_pol"] == loaded_counts["no_pol"]).all()
+    assert not loaded.fit_mode._fit_problem.signal_matrix.flags.writeable
+    loaded.run_fit()
+    assert loaded.fill_toys(n_toys=2).valid.all()
+
+
+def test_pickle_fit_public_minuit_state(data_set1, monkeypatch):
+    # As if a future iminuit version renamed its internal attributes.
+    monkeypatch.setattr(
+        minimizer_state,
+        "_minuit_attributes",
+        minimizer_state._minuit_attributes + ["_renamed"],
+    )
+    fit = alldecays.Fit(
+        data_set1,
+        fit_mode="Poisson",
+        print_brs_sum_not_1=False,
+        analytic_covariance=True,
+    )
+    loaded = pickle.loads(pickle.dumps(fit))
+    assert loaded.Minuit.valid
+    # MIGRAD finds the minimum again, within its tolerance.
+    tolerance = 0.01 * min(fit.fit_mode.errors)
+    assert loaded.fit_mode.values == pytest.approx(fit.fit_mode.values, abs=tolerance)
+    assert loaded.fit_mode.covariance == pytest.approx(
+        fit.fit_mode.covariance, rel=1e-2
+    )
+
+
+def test_refit():
+    data_set = alldecays.DataSet(decay_names)
+    data_set.add_channels({"a": channel1_path, "b": channel2_path})
+    # The exact errors do not depend on the path of the minimizer.
+    kwargs = dict(
+        fit_mode="Poisson", print_brs_sum_not_1=False, analytic_covariance=True
+    )
+    fit = alldecays.Fit(data_set, **kwargs)
+    signal_a, _ = data_set.get_channels()["a"]._get_fit_blocks()
+
+    data_set.drop_channels(["b"])
+    refit = fit.refit()
+    assert refit.fit_mode._fit_problem.channel_names == ("a",)
+    assert fit.fit_mode._fit_problem.channel_names == ("a", "b")
+    assert data_set.get_channels()["a"]._get_fit_blocks()[0] is signal_a
+    fresh_fit = alldecays.Fit(data_set, **kwargs)
+    assert np.allclose(refit.fit_mode.values, fresh_fit.fit_mode.values, atol=1e-3)
+    assert np.allclose(refit.fit_mode.errors, fresh_fit.fit_mode.errors, rtol=1e-2)
+
+
+def test_fit_cache(data_set1, tmp_path):
+    cache = FitCache(tmp_path)
+    kwargs = dict(fit_mode="Poisson", print_brs_sum_not_1=False)
+    fit = cache.fit(data_set1, **kwargs)
+    cached_fit = cache.fit(data_set1, **kwargs)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cached_fit._data_set is data_set1
+    assert (cached_fit.fit_mode.values == fit.fit_mode.values).all()
+    cache.fit(data_set1, fit_mode="GaussianLeastSquares")
+    assert cache.misses == 2
+    # The cached fit remembers the option (e.g. for its toys).
+    cache.fit(data_set1, raise_invalid_fit_exception=False, **kwargs)
+    assert (cache.hits, cache.misses) == (1, 3)
+    # Fits to the expected counts do not use the random generator:
+    # A hit leaves it alone, whichever generator (if any) the entry was made with.
+    rng = np.random.default_rng(3)
+    rng_state = rng.bit_generator.state
+    assert cache.fit(data_set1, rng=rng, **kwargs).fit_mode.rng is rng
+    assert rng.bit_generator.state == rng_state
+    exact_kwargs = dict(analytic_covariance=True, **kwargs)
+    cache.fit(data_set1, rng=np.random.default_rng(4), **exact_kwargs)
+    cache.fit(data_set1, rng=rng, **exact_kwargs)
+    assert (cache.hits, cache.misses) == (3, 4)
+    assert rng.bit_generator.state == rng_state
+
+    rng = np.random.default_rng(5)
+    toys = cache.fill_toys(fit, n_toys=3, rng=rng)
+    rng_after_toys = rng.bit_generator.state
+    rng = np.random.default_rng(5)
+    cached_toys = cache.fill_toys(cached_fit, n_toys=3, rng=rng)
+    assert cache.hits == 4
+    assert (cached_toys.physics == toys.physics).all()
+    assert rng.bit_generator.state == rng_after_toys
+    # Without a random generator, the toys are not reproducible: No caching.
+    cache.fill_toys(fit, n_toys=3)
+    assert (cache.hits, cache.misses) == (4, 5)
+
+    # Any change of the data set is a new key.
+    modified = alldecays.DataSet(decay_names=data_set1.decay_names)
+    modified.add_channel("no_pol", channel1_path)
+    modified.luminosity_ifb = 2 * data_set1.luminosity_ifb
+    cache.fit(modified, **kwargs)
+    assert cache.misses == 6
+
+    cache.max_bytes = 0
+    cache.evict()
+    assert not list(tmp_path.glob("*.pkl"))
+
+
+def test_result_store(fit1, tmp_path):
+    store = ResultStore(tmp_path)
+    store.save(fit1, "fit1", luminosity=2000)
+    with pytest.raises(KeyError):
+        store.save(fit1, "fit1")
+    store.save(fit1, "fit1_lumi_5000", luminosity=5000)
+
+    store = ResultStore(tmp_path)  # Reload the index from disk.
+    assert len(store) == 2
+    assert store.find(luminosity=2000) == ["fit1"]
+    assert store.find(fit_mode=type(fit1.fit_mode).__name__, n_toys=10) == [
+        "fit1",
+        "fit1_lumi_5000",
+    ]
+    stored = store.load("fit1")
+    assert isinstance(stored, StoredFit)
+    assert stored.metadata["fit_problem"] == fit1.fit_mode._fit_problem.fingerprint
+    assert stored.metadata["data_set"] == fit1._data_set.fingerprint
+    assert (stored.toys.physics == fit1.toys.physics).all()
+    assert (
+        stored.toys._channel_counts[3]["no_pol"]
+        == fit1.toys._channel_counts[3]["no_pol"]
+    ).all()
+    for param_space in ["internal", "physics"]:
+        for use_toys in [False, True]:
+            fp_fit = get_fit_parameters(fit1, param_space, use_toys)
+            fp_stored = get_fit_parameters(stored, param_space, use_toys)
+            assert tuple(fp_fit.names) == fp_stored.names
+            assert np.allclose(fp_fit.values, fp_stored.values)
+            assert np.allclose(fp_fit.covariance, fp_stored.covariance)
+
+    store.remove("fit1_lumi_5000")
+    assert list(store.load_all()) == ["fit1"]
+
+
+def _shared_problem_toy_fit(handle, seed):
+    problem = handle.attach()
+    assert not problem.signal_matrix.flags.owndata
+    fit = alldecays.Fit(
+        problem,
+        fit_mode="Poisson",
+        use_expected_counts=False,
+        rng=np.random.default_rng(seed),
+        print_brs_sum_not_1=False,
+    )
+    return np.array(fit.fit_mode.values)
+
+
+def test_shared_fit_problem(data_set1):
+    problem = FitProblem.from_data_set(data_set1)
+    with SharedFitProblem(problem) as shared:
+        handle = pickle.loads(pickle.dumps(shared.handle))
+        attached = handle.attach()
+        assert attached.fingerprint == problem.fingerprint
+        assert attached.data_set_fingerprint == data_set1.fingerprint
+        assert (attached.fit_start_brs == data_set1.fit_start_brs).all()
+
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            values = list(pool.map(_shared_problem_toy_fit, [handle] * 2, [1, 2]))
+    for seed, worker_values in zip([1, 2], values):
+        fit = alldecays.Fit(
+            data_set1,
+            fit_mode="Poisson",
+            use_expected_counts=False,
+            rng=np.random.default_rng(seed),
+            print_brs_sum_not_1=False,
+        )
+        assert np.allclose(worker_values, fit.fit_mode.values)
+
+
+def test_fit_problem(data_set1):
+    problem = FitProblem.from_data_set(data_set1)
+    channel = data_set1.get_channels()["no_pol"]
+    assert problem.channel_names == ("no_pol",)
+    n_decays = len(data_set1.decay_names)
+    assert problem.signal_matrix.shape == (problem.n_boxes, n_decays)
+    assert (problem.expected_counts == channel._get_expected_counts_array()).all()
+    with pytest.raises(ValueError):
+        problem.signal_matrix[0, 0] = 1
+    assert FitProblem.from_data_set(data_set1).fingerprint == problem.fingerprint
+    assert pickle.loads(pickle.dumps(problem)).fingerprint == problem.fingerprint
+    assert problem.data_set_fingerprint == data_set1.fingerprint
+
+    toy_counts = problem.draw_toy_counts(np.random.default_rng(3))
+    channel_toys = channel.get_toys(rng=np.random.default_rng(3))
+    assert (toy_counts == channel_toys).all()
+
+    fit = alldecays.Fit(data_set1, fit_mode="Poisson", print_brs_sum_not_1=False)
+    assert fit.fit_mode._fit_problem.fingerprint == problem.fingerprint
+    toy_fit = alldecays.Fit(
+        data_set1,
+        fit_mode="Poisson",
+        use_expected_counts=False,
+        print_brs_sum_not_1=False,
+        _fit_problem=fit.fit_mode._fit_problem,
+    )
+    assert toy_fit.fit_mode._fit_problem is fit.fit_mode._fit_problem
@@ -29,3 +29,12 @@ def test_fit_comparison_external(fit1, test_plot_dir):
     alldecays.plotting.compare_errors_only(fits, ax)
     fig.tight_layout()
     fig.savefig(test_plot_dir / "comparison_errors.png")
+
+
+def test_fit_comparison_stored(fit1, test_plot_dir, tmp_path):
+    store = alldecays.fitting.ResultStore(tmp_path)
+    store.save(fit1, "stored")
+    fits = {"fit": fit1, **store.load_all()}
+    fig = alldecays.plotting.compare_values(fits, use_toys=True)
+    fig.savefig(test_plot_dir / "comparison_values_stored.png")
+    alldecays.plotting.toy_hists(fits["stored"], test_plot_dir)
@@ -1,3 +1,6 @@
+import numpy as np
+import pytest
+
 import alldecays
 
 
@@ -5,3 +8,35 @@ def test_standard_toys(data_set1):
     fit = alldecays.Fit(data_set1)
     fit.fill_toys(n_toys=2)
     fit.fill_toys(n_toys=2, store_channel_counts=True)
+
+
+def test_warm_start_toys(data_set1):
+    fit = alldecays.Fit(data_set1)
+    n_toys = 5
+    toys = {}
+    for warm_start, warm_start_covariance in [
+        (False, False),
+        (True, False),
+        (True, True),
+    ]:
+        rng = np.random.default_rng(1)
+        toys[warm_start, warm_start_covariance] = fit.fill_toys(
+            n_toys,
+            rng,
+            warm_start=warm_start,
+            warm_start_covariance=warm_start_covariance,
+        )
+    cold = toys[False, False]
+    for warm in [toys[True, False], toys[True, True]]:
+        assert warm.valid.all()
+        assert warm.physics == pytest.approx(cold.physics, abs=1e-3)
+    assert toys[True, True].nfcn.mean() < cold.nfcn.mean()
+
+
+def test_values_only_toys(data_set1):
+    fit = alldecays.Fit(data_set1)
+    default_toys = fit.fill_toys(5, np.random.default_rng(1))
+    fast_toys = fit.fill_toys(5, np.random.default_rng(1), fit_step="values_only")
+    assert fast_toys.valid.all()
+    assert fast_toys.nfcn.mean() < default_toys.nfcn.mean()
+    assert fast_toys.physics == pytest.approx(default_toys.physics, abs=1e-3)